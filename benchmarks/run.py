@@ -0,0 +1,284 @@
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from pathlib import Path
+
+from benchmarks import synthetic
+
+BASELINE = Path(__file__).parent / "baseline.json"
+DEFAULT_SIZES = [10000, 100000]
+
+# name -> (setup, fixed size or None). setup(size) builds the inputs and returns the call to time.
+BENCHMARKS = {}
+
+
+def benchmark(name, size=None):
+  """Register a benchmark; `size` pins it to one size (e.g. a recorded fixture) whatever --sizes says."""
+  def decorator(setup):
+    BENCHMARKS[name] = (setup, size)
+    return setup
+  return decorator
+
+
+class _FixtureCache:
+  # Answers every lookup with one response body, as the response cache would after a real request
+  def __init__(self, body_file):
+    self.body_file = Path(body_file)
+
+  def lookup(self, endpoint, parameters, ignore_ttl=False):
+    return self.body_file, 200, 'fixture'
+
+
+def _shotchartdetail(body_file):
+  # The league shot frame as fetch_shots builds it, from a response body on disk
+  from nba_api.stats.endpoints import shotchartdetail
+  from utils import StatsHTTP
+  from utils.ShotSchema import typed_shots
+
+  StatsHTTP.install(offline=True, cache=_FixtureCache(body_file))
+  return lambda: typed_shots(shotchartdetail.ShotChartDetail(team_id=0, player_id=0, context_measure_simple='FGA').get_data_frames()[0])
+
+
+@benchmark('parse_fixture', size=5000)
+def _parse_fixture(size):
+  fixture = synthetic.FIXTURE_DIR / "shotchartdetail.json.gz"
+  if not fixture.exists():
+    synthetic.record_fixture(fixture, n=size)
+  return _shotchartdetail(fixture)
+
+
+@benchmark('parse_response')
+def _parse_response(size):
+  return _shotchartdetail(synthetic.record_fixture(Path(tempfile.mkdtemp()) / "shots.json.gz", n=size))
+
+
+@benchmark('typed_shots')
+def _typed_shots(size):
+  from utils.ShotSchema import typed_shots
+  shots = synthetic.shot_chart(size)
+  return lambda: typed_shots(shots)
+
+
+@benchmark('shot_distance')
+def _shot_distance(size):
+  from utils.ShotDistance import get_shots_yml
+  from utils.ShotSchema import typed_shots
+  shots = typed_shots(synthetic.shot_chart(size))
+  return lambda: get_shots_yml(shots)
+
+
+@benchmark('moreyball')
+def _moreyball(size):
+  from leagueleaders import process_shooting_data
+  table = synthetic.shot_locations(size)
+  return lambda: process_shooting_data(table.copy())
+
+
+@benchmark('moreyball_response')
+def _moreyball_response(size):
+  # The shot locations parsed from a response body (two header levels, so nba_api's full decode), then Moreyball
+  from leagueleaders import get_shooting_data
+  from utils import StatsHTTP
+
+  body = synthetic.record_shot_locations(Path(tempfile.mkdtemp()) / "shot_locations.json.gz", n_players=size)
+  StatsHTTP.install(offline=True, cache=_FixtureCache(body))
+  return lambda: get_shooting_data('2024-25')
+
+
+@benchmark('moreyball_yaml')
+def _moreyball_yaml(size):
+  from leagueleaders import MOREYBALL_FIELDS, process_shooting_data
+  from utils.Artifacts import write_yaml
+  data = process_shooting_data(synthetic.shot_locations(size))
+  return lambda: write_yaml(data, 'moreyball_full.yml', MOREYBALL_FIELDS)
+
+
+@benchmark('jerseys')
+def _jerseys(size):
+  from leagueleaders import save_cohorts
+  totals, index = synthetic.league_totals(size)
+  return lambda: save_cohorts(totals, index, ['jersey'])
+
+
+@benchmark('cohorts')
+def _cohorts(size):
+  from leagueleaders import save_cohorts
+  totals, index = synthetic.league_totals(size)
+  return lambda: save_cohorts(totals, index)
+
+
+@benchmark('plot_shots')
+def _plot_shots(size):
+  import matplotlib
+  matplotlib.use('Agg')
+  import matplotlib.pyplot as plt
+  from utils.CourtPlot import CourtPlot
+  from utils.ShotSchema import typed_shots
+
+  plot = CourtPlot("Benchmark Player", bg="#e4dbcd", ec="#403126", fc="#efd5b9")
+  # Looked up and downloaded in a real run; set here so nothing touches the network
+  plot.player_id = 0
+  plot.shots_df = typed_shots(synthetic.shot_chart(size))
+  plot.player_pic = np.full((190, 260, 3), 200, dtype=np.uint8)
+
+  def run():
+    plot.plot_shots(title_text="Moreyball Pct. League Leader", subtitle_text="Benchmark Player", save_plot=True)
+    plt.close('all')
+  return run
+
+
+@benchmark('shot_grids')
+def _shot_grids(size):
+  from utils.ShotGrid import ShotGrids
+  from utils.ShotSchema import typed_shots
+  shots = typed_shots(synthetic.shot_chart(size))
+  return lambda: ShotGrids.from_shots(shots)
+
+
+@benchmark('plot_heatmap')
+def _plot_heatmap(size):
+  import matplotlib
+  matplotlib.use('Agg')
+  import matplotlib.pyplot as plt
+  from utils.CourtPlot import CourtPlot
+  from utils.ShotGrid import ShotGrids
+  from utils.ShotSchema import typed_shots
+
+  shots = typed_shots(synthetic.shot_chart(size))
+  plot = CourtPlot("Benchmark Player", bg="#e4dbcd", ec="#403126", fc="#efd5b9", grids=ShotGrids.from_shots(shots))
+  # The busiest shooter, so the chart covers as many cells as it can
+  plot.player_id = int(shots.PLAYER_ID.value_counts().index[0])
+  plot.player_pic = np.full((190, 260, 3), 200, dtype=np.uint8)
+
+  def run():
+    plot.plot_shots(title_text="Benchmark Player", save_plot=True, mode='heatmap')
+    plt.close('all')
+  return run
+
+
+@benchmark('tag_possessions')
+def _tag_possessions(size):
+  from utils.Possessions import tag_possessions
+  pbp = synthetic.play_by_play(size)
+  return lambda: tag_possessions(pbp, processes=1)
+
+
+@benchmark('event_index')
+def _event_index(size):
+  from utils.EventIndex import EventIndex
+  pbp = synthetic.play_by_play(size)
+  return lambda: EventIndex(pbp)
+
+
+@benchmark('match_events')
+def _match_events(size):
+  from utils.EventIndex import EventIndex
+  pbp = synthetic.play_by_play(size)
+  index = EventIndex(pbp)
+  log = synthetic.challenges(pbp)
+
+  def run():
+    events = log.assign(GAME_ID=index.resolve_games(log))
+    return index.match(events)
+  return run
+
+
+def measure(run, repeat=3):
+  """Best wall time of `repeat` calls, then the peak traced allocation (MB) of one more."""
+  seconds = []
+  for _ in range(repeat):
+    gc.collect()
+    start = time.perf_counter()
+    run()
+    seconds.append(time.perf_counter() - start)
+
+  # Tracing slows Python code down, so memory gets a call of its own
+  gc.collect()
+  tracemalloc.start()
+  try:
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+  finally:
+    tracemalloc.stop()
+  return {'seconds': min(seconds), 'peak_mb': peak / 1e6}
+
+
+def run_benchmarks(names, sizes, repeat=3):
+  """{benchmark: {size: {'seconds', 'peak_mb'}}} for every benchmark in `names` at each of `sizes`."""
+  results = {}
+  for name in names:
+    setup, fixed = BENCHMARKS[name]
+    for size in [fixed] if fixed else sizes:
+      result = measure(setup(size), repeat)
+      results.setdefault(name, {})[str(size)] = result
+      print(f"{name:<18} {size:>9,} {result['seconds']:>9.3f}s {result['peak_mb']:>9.1f}MB", flush=True)
+  return results
+
+
+def compare(results, baseline, ratio=1.25, min_seconds=0.05, min_mb=1.0):
+  """
+  (benchmark, size, metric, baseline, latest) for every result at least `ratio` times its
+  baseline, ignoring differences under `min_seconds` and `min_mb`.
+  """
+  regressions = []
+  for name, by_size in results.items():
+    for size, result in by_size.items():
+      base = baseline.get(name, {}).get(size)
+      if base is None:
+        continue
+      for metric, floor in [('seconds', min_seconds), ('peak_mb', min_mb)]:
+        if result[metric] >= base[metric] * ratio and result[metric] - base[metric] >= floor:
+          regressions.append((name, size, metric, base[metric], result[metric]))
+  return regressions
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description="Time and measure peak memory of the pipeline's hot paths on synthetic data, offline")
+  parser.add_argument('names', nargs='*', help=f"benchmarks to run (default all): {', '.join(BENCHMARKS)}")
+  parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="rows (players for moreyball and jerseys)")
+  parser.add_argument('--repeat', type=int, default=3)
+  parser.add_argument('--baseline', type=Path, default=BASELINE)
+  parser.add_argument('--save', action='store_true', help="store these results as the baseline")
+  parser.add_argument('--ratio', type=float, default=1.25, help="flag results this many times the baseline")
+  args = parser.parse_args()
+
+  unknown = set(args.names) - set(BENCHMARKS)
+  if unknown:
+    parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+  # The stages write their csv/yml/png files into the working directory
+  args.baseline = args.baseline.resolve()
+  logging.disable(logging.INFO)
+  workdir = tempfile.mkdtemp(prefix='nba-bench-')
+  os.makedirs(os.path.join(workdir, 'data', 'dynamic'))
+  os.chdir(workdir)
+
+  results = run_benchmarks(args.names or list(BENCHMARKS), args.sizes, args.repeat)
+  baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else None
+
+  if args.save:
+    # Merged into the stored baseline, so running a subset only replaces those numbers
+    stored = baseline['results'] if baseline else {}
+    for name, by_size in results.items():
+      stored.setdefault(name, {}).update(by_size)
+    args.baseline.write_text(json.dumps({
+      'machine': f"{platform.machine()} {platform.processor() or platform.system()}, {os.cpu_count()} CPUs",
+      'python': platform.python_version(),
+      'results': stored,
+    }, indent=2, sort_keys=True) + '\n')
+    print(f"Baseline saved to {args.baseline}")
+  elif baseline:
+    regressions = compare(results, baseline['results'], args.ratio)
+    for name, size, metric, base, latest in regressions:
+      print(f"REGRESSION {name} at {int(size):,}: {metric} {base:.3f} -> {latest:.3f}")
+    if not regressions:
+      print(f"No regressions against {args.baseline}")
@@ -0,0 +1,328 @@
+import argparse
+import gzip
+import json
+
+import numpy as np
+import pandas as pd
+
+from pathlib import Path
+from nba_api.stats.static import teams
+
+FIXTURE_DIR = Path(__file__).parent / "fixtures"
+
+TEAM_IDS = np.array(sorted(t['id'] for t in teams.get_teams()))
+TEAM_ABBREVIATIONS = np.array([t['abbreviation'] for t in sorted(teams.get_teams(), key=lambda t: t['id'])])
+
+# ShotChartDetail zones, with how often shots come from each
+SHOT_ZONES = {
+  'Restricted Area': ('Center(C)', 'Less Than 8 ft.', 2, 0.30),
+  'In The Paint (Non-RA)': ('Center(C)', '8-16 ft.', 2, 0.17),
+  'Mid-Range': ('Left Side Center(LC)', '16-24 ft.', 2, 0.11),
+  'Left Corner 3': ('Left Side(L)', '24+ ft.', 3, 0.05),
+  'Right Corner 3': ('Right Side(R)', '24+ ft.', 3, 0.05),
+  'Above the Break 3': ('Center(C)', '24+ ft.', 3, 0.315),
+  'Backcourt': ('Back Court(BC)', 'Back Court Shot', 3, 0.005),
+}
+ACTION_TYPES = ['Jump Shot', 'Pullup Jump shot', 'Driving Layup Shot', 'Layup Shot', 'Dunk Shot',
+                'Step Back Jump shot', 'Cutting Layup Shot', 'Tip Layup Shot', 'Floating Jump shot', 'Hook Shot']
+
+# Play-by-play events per game, and the event type mix (EVENTMSGTYPE: share)
+EVENTS_PER_GAME = 460
+EVENT_TYPES = {1: 0.19, 2: 0.24, 3: 0.10, 4: 0.24, 5: 0.06, 6: 0.09, 8: 0.05, 9: 0.03}
+
+
+def _players(n_players, rng):
+  # Player ids, with each player on one team
+  ids = 1626000 + np.arange(n_players) * 7
+  return ids, TEAM_IDS[rng.integers(0, len(TEAM_IDS), n_players)]
+
+
+def shot_chart(n, players=None, seed=0):
+  """
+  A ShotChartDetail frame of `n` shots, with every column the endpoint returns and
+  league-like spreads of players, games, zones, distances and makes.
+  """
+  rng = np.random.default_rng(seed)
+  player_ids, player_teams = _players(players or max(50, min(n // 400, 600)), rng)
+  # A few high volume shooters and a long tail
+  weights = rng.gamma(1.5, 1.0, len(player_ids))
+  who = rng.choice(len(player_ids), n, p=weights / weights.sum())
+
+  zones = np.array(list(SHOT_ZONES))
+  zone = rng.choice(len(zones), n, p=[v[3] for v in SHOT_ZONES.values()])
+  area = np.array([v[0] for v in SHOT_ZONES.values()])[zone]
+  zone_range = np.array([v[1] for v in SHOT_ZONES.values()])[zone]
+  points = np.array([v[2] for v in SHOT_ZONES.values()])[zone]
+  distance = np.where(points == 3, rng.integers(22, 30, n), rng.integers(0, 22, n))
+  distance[zones[zone] == 'Backcourt'] = rng.integers(40, 80, (zones[zone] == 'Backcourt').sum())
+  angle = rng.uniform(0, np.pi, n)
+  made = (rng.random(n) < np.where(points == 3, 0.36, 0.52)).astype(np.int64)
+
+  games = np.sort(rng.integers(1, max(2, n // 170), n))
+  # Event ids rise through each game, a few plays apart, so (GAME_ID, GAME_EVENT_ID) is unique as in the feed
+  nth_shot = np.arange(n) - np.searchsorted(games, games)
+  team = player_teams[who]
+  opponent = TEAM_IDS[(np.searchsorted(TEAM_IDS, team) + 1 + games % 29) % len(TEAM_IDS)]
+  abbreviation = dict(zip(TEAM_IDS.tolist(), TEAM_ABBREVIATIONS.tolist()))
+  return pd.DataFrame({
+    'GRID_TYPE': 'Shot Chart Detail',
+    'GAME_ID': pd.Series(games).map('002240{:04d}'.format).to_numpy(),
+    'GAME_EVENT_ID': 2 + 4 * nth_shot + rng.integers(0, 4, n),
+    'PLAYER_ID': player_ids[who],
+    'PLAYER_NAME': pd.Series(player_ids[who]).map('Player {}'.format).to_numpy(),
+    'TEAM_ID': team,
+    'TEAM_NAME': pd.Series(team).map(abbreviation).to_numpy(),
+    'PERIOD': rng.integers(1, 5, n),
+    'MINUTES_REMAINING': rng.integers(0, 12, n),
+    'SECONDS_REMAINING': rng.integers(0, 60, n),
+    'EVENT_TYPE': np.where(made == 1, 'Made Shot', 'Missed Shot'),
+    'ACTION_TYPE': np.array(ACTION_TYPES)[rng.integers(0, len(ACTION_TYPES), n)],
+    'SHOT_TYPE': np.where(points == 3, '3PT Field Goal', '2PT Field Goal'),
+    'SHOT_ZONE_BASIC': zones[zone],
+    'SHOT_ZONE_AREA': area,
+    'SHOT_ZONE_RANGE': zone_range,
+    'SHOT_DISTANCE': distance,
+    'LOC_X': np.round(distance * 10 * np.cos(angle)).astype(np.int64),
+    'LOC_Y': np.round(distance * 10 * np.sin(angle)).astype(np.int64) - 50,
+    'SHOT_ATTEMPTED_FLAG': 1,
+    'SHOT_MADE_FLAG': made,
+    'GAME_DATE': pd.Series(games % 160).map(lambda d: f"2025{1 + d // 30:02d}{1 + d % 28:02d}").to_numpy(),
+    'HTM': pd.Series(team).map(abbreviation).to_numpy(),
+    'VTM': pd.Series(opponent).map(abbreviation).to_numpy(),
+  })
+
+
+def shot_locations(n_players, seed=0):
+  """
+  A LeagueDashPlayerShotLocations table for `n_players`: MultiIndex columns of (zone, FGM/FGA/FG_PCT),
+  with the identity columns under an empty zone, as the endpoint's get_data_frame returns it.
+  """
+  rng = np.random.default_rng(seed)
+  player_ids, player_teams = _players(n_players, rng)
+  abbreviation = dict(zip(TEAM_IDS.tolist(), TEAM_ABBREVIATIONS.tolist()))
+  columns = {
+    ('', 'PLAYER_ID'): player_ids,
+    ('', 'PLAYER_NAME'): [f"Player {p}" for p in player_ids],
+    ('', 'TEAM_ID'): player_teams,
+    ('', 'TEAM_ABBREVIATION'): pd.Series(player_teams).map(abbreviation).to_numpy(),
+    ('', 'AGE'): rng.integers(19, 40, n_players).astype(np.float64),
+    ('', 'NICKNAME'): [f"P{p}" for p in player_ids],
+  }
+  attempts = np.round(rng.gamma(2.0, 250, n_players)).astype(np.int64)
+  for zone, (_, _, points, share) in SHOT_ZONES.items():
+    fga = rng.binomial(attempts, share)
+    fgm = rng.binomial(fga, 0.36 if points == 3 else 0.5)
+    columns[(zone, 'FGM')], columns[(zone, 'FGA')] = fgm, fga
+    with np.errstate(invalid='ignore', divide='ignore'):
+      columns[(zone, 'FG_PCT')] = np.round(fgm / fga, 3)
+  # The table also has both corners added together
+  fgm = columns[('Left Corner 3', 'FGM')] + columns[('Right Corner 3', 'FGM')]
+  fga = columns[('Left Corner 3', 'FGA')] + columns[('Right Corner 3', 'FGA')]
+  columns[('Corner 3', 'FGM')], columns[('Corner 3', 'FGA')] = fgm, fga
+  with np.errstate(invalid='ignore', divide='ignore'):
+    columns[('Corner 3', 'FG_PCT')] = np.round(fgm / fga, 3)
+
+  df = pd.DataFrame(columns)
+  df.columns = pd.MultiIndex.from_tuples(df.columns, names=['SHOT_CATEGORY', 'columns'])
+  return df
+
+
+def league_totals(n_players, seed=0):
+  """The LeagueLeaders Totals table for `n_players`, and a PlayerIndex with their jersey numbers and bio details."""
+  rng = np.random.default_rng(seed)
+  player_ids, player_teams = _players(n_players, rng)
+  gp = rng.integers(1, 83, n_players)
+  minutes = gp * rng.integers(5, 38, n_players)
+  fga = np.round(minutes * rng.uniform(0.2, 0.7, n_players)).astype(np.int64)
+  fgm = rng.binomial(fga, 0.47)
+  fg3a = rng.binomial(fga, 0.4)
+  fg3m = rng.binomial(fg3a, 0.36)
+  fta = rng.binomial(fga, 0.25)
+  ftm = rng.binomial(fta, 0.78)
+  reb = np.round(minutes * rng.uniform(0.05, 0.4, n_players)).astype(np.int64)
+  ast = np.round(minutes * rng.uniform(0.02, 0.3, n_players)).astype(np.int64)
+  tov = np.round(minutes * rng.uniform(0.02, 0.1, n_players)).astype(np.int64)
+  stl = np.round(minutes * rng.uniform(0.01, 0.06, n_players)).astype(np.int64)
+  abbreviation = dict(zip(TEAM_IDS.tolist(), TEAM_ABBREVIATIONS.tolist()))
+  with np.errstate(invalid='ignore', divide='ignore'):
+    totals = pd.DataFrame({
+      'PLAYER_ID': player_ids, 'RANK': np.arange(1, n_players + 1),
+      'PLAYER': [f"Player {p}" for p in player_ids], 'TEAM_ID': player_teams,
+      'TEAM': pd.Series(player_teams).map(abbreviation).to_numpy(), 'GP': gp, 'MIN': minutes,
+      'FGM': fgm, 'FGA': fga, 'FG_PCT': np.round(fgm / fga, 3), 'FG3M': fg3m, 'FG3A': fg3a,
+      'FG3_PCT': np.round(fg3m / fg3a, 3), 'FTM': ftm, 'FTA': fta, 'FT_PCT': np.round(ftm / fta, 3),
+      'OREB': reb // 4, 'DREB': reb - reb // 4, 'REB': reb, 'AST': ast, 'STL': stl,
+      'BLK': stl // 2, 'TOV': tov, 'PF': gp * 2, 'PTS': 2 * fgm + fg3m + ftm, 'EFF': fgm + reb + ast,
+      'AST_TOV': np.round(ast / tov, 2), 'STL_TOV': np.round(stl / tov, 2),
+    })
+  index = pd.DataFrame({
+    'PERSON_ID': player_ids,
+    'TEAM_ID': player_teams,
+    'JERSEY_NUMBER': rng.integers(0, 100, n_players).astype(str),
+  })
+  # Bio columns the cohorts group by, with the gaps the real index has (undrafted, no college)
+  index['POSITION'] = rng.choice(['G', 'G-F', 'F', 'F-C', 'C'], n_players)
+  index['HEIGHT'] = [f"{h // 12}-{h % 12}" for h in rng.integers(70, 88, n_players).tolist()]
+  index['COLLEGE'] = np.where(rng.random(n_players) < 0.1, None, rng.choice([f"College {i}" for i in range(200)], n_players))
+  index['COUNTRY'] = np.where(rng.random(n_players) < 0.75, 'USA', rng.choice([f"Country {i}" for i in range(40)], n_players))
+  index['DRAFT_YEAR'] = pd.array(np.where(rng.random(n_players) < 0.15, -1, rng.integers(2005, 2026, n_players)), dtype='Int64')
+  index.loc[index.DRAFT_YEAR == -1, 'DRAFT_YEAR'] = pd.NA
+  return totals, index
+
+
+def schedule(n_games, start='2024-10-22'):
+  """
+  (home team ids, away team ids, GAME_DATEs) for `n_games` games. Games are drawn from a round robin
+  of the 30 teams, each round split over two days, so every team plays at most once a date.
+  """
+  pairs = len(TEAM_IDS) // 2
+  game = np.arange(n_games)
+  rounds, k = game // pairs, game % pairs
+  # The circle method: the last team stays put while the others rotate a place each round
+  turn = rounds % (len(TEAM_IDS) - 1)
+  first = np.where(k == 0, len(TEAM_IDS) - 1, (turn + k) % (len(TEAM_IDS) - 1))
+  second = np.where(k == 0, turn, (turn - k) % (len(TEAM_IDS) - 1))
+  # Alternate home and away from round to round
+  home = np.where(rounds % 2 == 0, first, second)
+  away = np.where(rounds % 2 == 0, second, first)
+  day = 2 * rounds + (k >= (pairs + 1) // 2)
+  dates = (pd.Timestamp(start) + pd.to_timedelta(day, unit='D')).strftime('%Y-%m-%d').to_numpy()
+  return TEAM_IDS[home], TEAM_IDS[away], dates
+
+
+def play_by_play(n, seed=0):
+  """
+  PlayByPlayV2 events for about `n` / EVENTS_PER_GAME games, with the game details PBPIngest adds.
+  Each period starts with a period start (the first with a jump ball) and ends with a period end;
+  scores are only reported on made baskets, as in the real feed. Games follow schedule(), so no
+  team plays twice on a date.
+  """
+  rng = np.random.default_rng(seed)
+  n_games = max(1, n // EVENTS_PER_GAME)
+  per_period = EVENTS_PER_GAME // 4
+  game = np.repeat(np.arange(n_games), EVENTS_PER_GAME)
+  period = np.tile(np.repeat(np.arange(1, 5), per_period), n_games)
+  slot = np.tile(np.arange(per_period), 4 * n_games)
+
+  kinds = list(EVENT_TYPES)
+  event = np.array(kinds)[rng.choice(len(kinds), len(game), p=list(EVENT_TYPES.values()))]
+  event[slot == 0] = 12
+  event[slot == per_period - 1] = 13
+  event[(slot == 1) & (period == 1)] = 10
+  action = np.where(event == 3, rng.choice([10, 11, 12, 13, 14, 15], len(game)), rng.integers(1, 8, len(game)))
+  # Clocks run down through the period, with several events sharing a second
+  seconds = 720 - np.round(slot * 720 / (per_period - 1)).astype(np.int64)
+
+  home_teams, away_teams, dates = schedule(n_games)
+  home, away = home_teams[game], away_teams[game]
+  home_event = rng.random(len(game)) < 0.5
+  team = np.where(home_event, home, away).astype(np.float64)
+  team[np.isin(event, [12, 13])] = np.nan
+  abbreviation = dict(zip(TEAM_IDS.tolist(), TEAM_ABBREVIATIONS.tolist()))
+
+  points = np.where(event == 1, rng.choice([2, 3], len(game), p=[0.65, 0.35]), np.where(event == 3, 1, 0))
+  scored = (points > 0) & ((event == 1) | (rng.random(len(game)) < 0.76))
+  home_points = np.where(scored & home_event, points, 0)
+  away_points = np.where(scored & ~home_event, points, 0)
+  # Running totals per game
+  starts = np.arange(n_games) * EVENTS_PER_GAME
+  home_score = np.cumsum(home_points) - np.repeat(np.cumsum(home_points)[starts] - home_points[starts], EVENTS_PER_GAME)
+  away_score = np.cumsum(away_points) - np.repeat(np.cumsum(away_points)[starts] - away_points[starts], EVENTS_PER_GAME)
+  score = pd.Series(away_score).astype(str) + ' - ' + pd.Series(home_score).astype(str)
+
+  game_ids = pd.Series(np.arange(n_games)).map('00224{:05d}'.format).to_numpy()
+  team_abbreviation = pd.Series(team).map(abbreviation)
+  pbp = pd.DataFrame({
+    'GAME_ID': game_ids[game],
+    'EVENTNUM': slot + (period - 1) * per_period + 1,
+    'EVENTMSGTYPE': event,
+    'EVENTMSGACTIONTYPE': action,
+    'PERIOD': period,
+    'PCTIMESTRING': pd.Series(seconds // 60).astype(str) + ':' + pd.Series(seconds % 60).astype(str).str.zfill(2),
+    'HOMEDESCRIPTION': np.where(home_event & (event == 9) & (rng.random(len(game)) < 0.1), 'Coach Challenge', None),
+    'VISITORDESCRIPTION': None,
+    'NEUTRALDESCRIPTION': None,
+    'SCORE': score.where(scored | (event == 13)).to_numpy(),
+    'PLAYER1_ID': np.where(np.isnan(team), np.nan, team * 10 + rng.integers(0, 5, len(game))),
+    'PLAYER1_TEAM_ID': team,
+    'PLAYER1_TEAM_ABBREVIATION': team_abbreviation.to_numpy(),
+    'PLAYER3_TEAM_ABBREVIATION': np.where(event == 10, team_abbreviation.fillna(abbreviation[home[0]]), None),
+    'GAME_DATE': dates[game],
+    'AWAY_TEAM': pd.Series(away).map(abbreviation).to_numpy(),
+    'HOME_TEAM': pd.Series(home).map(abbreviation).to_numpy(),
+  })
+  # The jump ball is won by the home team, so every game has a first possession
+  tip = (event == 10)
+  pbp.loc[tip, 'PLAYER3_TEAM_ABBREVIATION'] = pbp.loc[tip, 'HOME_TEAM']
+  return pbp
+
+
+def challenges(pbp, seed=0):
+  """
+  A coach's challenge log for `pbp`, as read_challenges loads it: one challenge a second or so off every
+  challenge in the play-by-play, plus one in twenty that the play-by-play has no event near.
+  """
+  from utils.Possessions import clock_seconds
+
+  rng = np.random.default_rng(seed)
+  found = pbp[pbp['HOMEDESCRIPTION'].fillna('').str.contains('Challenge')]
+  log = found[['GAME_DATE', 'HOME_TEAM', 'AWAY_TEAM', 'PERIOD']].reset_index(drop=True)
+  log['PCTIME_SECONDS'] = clock_seconds(found['PCTIMESTRING']) + rng.uniform(-1.5, 1.5, len(found))
+  missed = log.sample(frac=0.05, random_state=seed).assign(PERIOD=5)
+  return pd.concat([log, missed], ignore_index=True)
+
+
+def response(endpoint, frames):
+  """A stats.nba.com response body for `frames` ({result set name: frame}), as the endpoint returns it."""
+  return {
+    'resource': endpoint,
+    'parameters': {},
+    'resultSets': [{'name': name, 'headers': list(df.columns), 'rowSet': df.astype(object).values.tolist()}
+                   for name, df in frames.items()],
+  }
+
+
+def shot_locations_response(n_players, seed=0):
+  """
+  A LeagueDashPlayerShotLocations response body for `n_players`. Its single result set has two header
+  levels (zones, then column names), which nba_api turns into the MultiIndex of shot_locations.
+  """
+  df = shot_locations(n_players, seed=seed)
+  zones = list(dict.fromkeys(z for z in df.columns.get_level_values(0) if z))
+  headers = [
+    {'name': 'SHOT_CATEGORY', 'columnsToSkip': 6, 'columnSpan': 3, 'columnNames': zones},
+    {'name': 'columns', 'columnSpan': 1, 'columnNames': list(df.columns.get_level_values(1))},
+  ]
+  rows = df.astype(object).where(df.notna(), None).values.tolist()
+  return {'resource': 'leaguedashplayershotlocations', 'parameters': {},
+          'resultSets': {'name': 'ShotLocations', 'headers': headers, 'rowSet': rows}}
+
+
+def _write_gzip_json(path, body):
+  path = Path(path)
+  path.parent.mkdir(parents=True, exist_ok=True)
+  with gzip.open(path, 'wt', encoding='utf-8') as f:
+    json.dump(body, f)
+  return path
+
+
+def record_shot_locations(path=FIXTURE_DIR / "leaguedashplayershotlocations.json.gz", n_players=500, seed=0):
+  """Write a gzipped LeagueDashPlayerShotLocations response for `n_players`, in the format of the response cache."""
+  return _write_gzip_json(path, shot_locations_response(n_players, seed=seed))
+
+
+def record_fixture(path=FIXTURE_DIR / "shotchartdetail.json.gz", n=5000, seed=0):
+  """Write a gzipped ShotChartDetail response of `n` shots, in the format of the response cache."""
+  shots = shot_chart(n, seed=seed)
+  averages = pd.DataFrame({'GRID_TYPE': 'League Averages', 'SHOT_ZONE_BASIC': list(SHOT_ZONES),
+                           'SHOT_ZONE_AREA': [v[0] for v in SHOT_ZONES.values()],
+                           'SHOT_ZONE_RANGE': [v[1] for v in SHOT_ZONES.values()],
+                           'FGA': 1000, 'FGM': 450, 'FG_PCT': 0.45})
+  return _write_gzip_json(path, response('shotchartdetail', {'Shot_Chart_Detail': shots, 'LeagueAverages': averages}))
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description="Write the recorded response fixtures used by the benchmarks")
+  parser.add_argument('--shots', type=int, default=5000, help="shots in the ShotChartDetail fixture")
+  args = parser.parse_args()
+  print(f"Wrote {record_fixture(n=args.shots)}")
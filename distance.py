@@ -1,9 +1,13 @@
 import pandas as pd
-import yaml
 from nba_api.stats.endpoints import leaguedashptstats
+from utils import StatsHTTP
+from utils.Artifacts import write_yaml
+from utils.Distance import DISTANCE_FIELDS
 
 
 def main():
+  StatsHTTP.install()
+
   # API request for player tracking stats
   df = leaguedashptstats.LeagueDashPtStats(
     per_mode_simple='Totals',
@@ -21,21 +25,7 @@ def main():
   df = df[df.MIN > 500].sort_values(by='MILES_PER_36', ascending=False)
 
   df.to_csv('data/dynamic/NBA_Leaders_Distance')
-  distance_yaml_list = [{
-    'id': str(df.iloc[i].PLAYER_ID),
-    'name': str(df.iloc[i].PLAYER_NAME),
-    'team': str(df.iloc[i].TEAM_ABBREVIATION),
-    'games': str(df.iloc[i].GP),
-    'minutes': str(df.iloc[i].MIN),
-    'miles': str(df.iloc[i].DIST_MILES),
-    'avg_speed': str(df.iloc[i].AVG_SPEED),
-    'marathons': str(df.iloc[i].DIST_MARATHONS),
-    'miles_per_game': str(df.iloc[i].MILES_PER_GAME),
-    'miles_per_thirty': str(df.iloc[i].MILES_PER_36)}
-    for i in range(len(df) - 1)]
-
-  with open('distance.yml', 'w') as stream:
-    yaml.dump(distance_yaml_list, stream)
+  write_yaml(df, 'distance.yml', DISTANCE_FIELDS)
 
 if __name__ == "__main__":
   main()
\ No newline at end of file
@@ -1,16 +1,28 @@
+import argparse
+import importlib
+import logging
 import time
-import pandas as pd
-import yaml
 
 from functools import wraps
 
-from nba_api.stats.endpoints import leagueleaders, leaguedashplayershotlocations, leaguedashptstats, playerindex
-from nba_api.stats.library.parameters import Season
+# Only light modules are imported up front. nba_api, matplotlib, PIL and requests are imported
+# by the stages that need them, so a single stage (or an import in a test) doesn't pay for the rest.
+from datetime import datetime
+from functools import partial
+from utils.FetchScheduler import DEFAULT_RATES, FetchScheduler, TokenBucket, CDN_HOST, STATS_HOST
+from utils.Artifacts import write_yaml
+from utils.Distance import DISTANCE_FIELDS
+from utils.Pipeline import Pipeline
+from utils.Profile import get_profile
 
 
-from datetime import datetime
-from utils.CourtPlot import CourtPlot
-from utils.ShotDistance import get_shots_yml
+def lazy(module, name):
+  """Stand-in for `module.name` that imports the module on its first call."""
+  def call(*args, **kwargs):
+    return getattr(importlib.import_module(module), name)(*args, **kwargs)
+  call.__name__ = name
+  return call
+
 
 # Retry Wrapper 
 def retry(max_attempts=5, delay=5):
@@ -27,58 +39,24 @@ def retry(max_attempts=5, delay=5):
           attempts += 1
           if attempts < max_attempts:
               print(f"Retrying in {delay} seconds...")
+              get_profile().retry(func.__name__)
               time.sleep(delay)
       raise Exception(f"Function {func.__name__} failed after {max_attempts} attempts")
     return wrapper
   return decorator
 
 
-def get_league_leaders(category, per_mode, top_n=50):
-  """Fetch league leaders data for a given category and mode."""
-
-  try:
-    leagueLead = leagueleaders.LeagueLeaders(league_id='00',
-                                          per_mode48=per_mode,
-                                          scope='S',
-                                          season=Season.default,
-                                          season_type_all_star='Regular Season',
-                                          stat_category_abbreviation=category
-    ).league_leaders.get_data_frame()    
-    return leagueLead.head(top_n)
-  
-  except Exception as err:
-    print(f"Error fetching data for {category} ({per_mode}): {err}")
-    return None
-  
-# Implementing debugging for the shot locations API
-from nba_api.stats.library.http import NBAStatsHTTP
-import logging
-
-logging.basicConfig(level=logging.DEBUG)
-logger = logging.getLogger(__name__)
-
-class LoggedNBAStatsHTTP(NBAStatsHTTP):
-    def send_api_request(self, endpoint, parameters, referer=None, proxy=None, headers=None, timeout=(20,120), raise_exception_on_error=False):
-        logger.debug(f"Starting API request to {endpoint}")
-        try:
-            response = super().send_api_request(endpoint, parameters, referer, proxy, headers, timeout, raise_exception_on_error)
-            logger.debug("Request completed successfully")
-            logger.debug("Starting to process response")
-            # Add any response info we can safely access
-            return response
-        except Exception as e:
-            logger.error(f"Request failed with error: {str(e)}")
-            logger.error(f"Error type: {type(e)}")
-            raise
-
-leaguedashplayershotlocations.NBAStatsHTTP = LoggedNBAStatsHTTP
-
 @retry(max_attempts=2, delay=5)  
-def get_shooting_data():
-  """Fetch shooting data and process for Moreyball analysis."""
+def get_shooting_data(season=None):
+  """Fetch shooting data for `season` (default the current one) and process for Moreyball analysis."""
+  from nba_api.stats.endpoints import leaguedashplayershotlocations
+  from nba_api.stats.library.parameters import Season
 
-  shotLocations = leaguedashplayershotlocations.LeagueDashPlayerShotLocations(timeout=(20,30))  
-  shotDF = shotLocations.shot_locations.get_data_frame()
+  shotLocations = leaguedashplayershotlocations.LeagueDashPlayerShotLocations(season=season or Season.default, timeout=(20,30))  
+  return process_shooting_data(shotLocations.shot_locations.get_data_frame())
+
+def process_shooting_data(shotDF):
+  """Moreyball shares of makes and attempts from the shot locations table, best first (min. 100 FGA)."""
 
   # Calculating Moreyball-specific stats from the shooting data, both makes and attempts
   for fg in ['FGM', 'FGA']:
@@ -93,25 +71,73 @@ def get_shooting_data():
   shotDF.columns = [col[1] if col[0] == "" else '_'.join(col) for col in shotDF.columns.values]
   return shotDF
 
+def leaders_csv(category, per_mode):
+  return f'data/dynamic/NBA_Leaders_{category}_{per_mode}.csv'
+
 def save_to_csv(data, category, per_mode):
   """Save the data to a csv file"""
 
   if data is not None:
-    csv_name = f'data/dynamic/NBA_Leaders_{category}_{per_mode}.csv'
+    csv_name = leaders_csv(category, per_mode)
     data.to_csv(csv_name,index=False)
     print(f"Data saved to {csv_name}")
   else:
     print(f"No data saved for {category} ({per_mode})")
 
 
-def distance_leaders():
+# Per game leaderboards saved to data/dynamic; any column of the Totals table works here
+LEADER_CATEGORIES = ['PTS', 'REB', 'AST']
+
+# Stats in every cohort .yml, after the cohort's own label (e.g. 'jersey': 'JERSEY_NUMBER')
+COHORT_FIELDS = {
+  'count': 'COUNT',
+  'MPG': 'MPG',
+  'PPG': 'PPG',
+  'APG': 'APG',
+  'RPG': 'RPG',
+  'MIN': 'MIN',
+  'GP': 'GP',
+  'PTS': 'PTS',
+  'AST': 'AST',
+  'REB': 'REB',
+  'FGA': 'FGA',
+  'FGM': 'FGM',
+}
+
+MOREYBALL_FIELDS = {
+  'id': 'PLAYER_ID',
+  'name': 'PLAYER_NAME',
+  'team': 'TEAM_ABBREVIATION',
+  'RA_FGM': 'Restricted Area_FGM',
+  'RA_FGA': 'Restricted Area_FGA',
+  'RA_PCT': 'Pct RA_FGA',
+  'THREE_FGM': 'Total from 3_FGM',
+  'THREE_FGA': 'Total from 3_FGA',
+  'THREE_PCT': 'Pct 3_FGA',
+  'MB_FGM': lambda df: df['Total from 3_FGM'] + df['Restricted Area_FGM'],
+  'MB_FGA': lambda df: df['Total from 3_FGA'] + df['Restricted Area_FGA'],
+  'TOTAL_FGM': 'Total Shots_FGM',
+  'TOTAL_FGA': 'Total Shots_FGA',
+  'MB_PCT': 'Pct Moreyball_FGA',
+}
+
+
+def get_distance_data(season=None):
+  """Fetch player tracking distance totals for `season` (default the current one)."""
+  from nba_api.stats.endpoints import leaguedashptstats
+  from nba_api.stats.library.parameters import Season
+
   # API request for player tracking stats
-  df = leaguedashptstats.LeagueDashPtStats(
+  return leaguedashptstats.LeagueDashPtStats(
+    season=season or Season.default,
     per_mode_simple='Totals',
     player_or_team='Player',
     pt_measure_type='SpeedDistance'
   ).get_data_frames()[0]
 
+
+def distance_table(df):
+  """Distance leaders from the tracking totals: marathons, miles per game and per 36 (min. 200 minutes)."""
   marathon_miles = 26.219
 
   # Updating the dataframe
@@ -119,119 +145,239 @@ def distance_leaders():
   df['MILES_PER_GAME'] = df.DIST_MILES / df.GP
   df['MILES_PER_36'] = df.DIST_MILES / df.MIN * 36
 
-  df = df[df.MIN > 200].sort_values(by='MILES_PER_36', ascending=False)
+  return df[df.MIN > 200].sort_values(by='MILES_PER_36', ascending=False)
+
+
+def distance_leaders(df=None):
+  """Save the distance leaders to csv and yml files."""
+  if df is None:
+    df = distance_table(get_distance_data())
 
   df.to_csv('data/dynamic/NBA_Leaders_Distance.csv')
-  distance_yaml_list = [{
-    'id': str(df.iloc[i].PLAYER_ID),
-    'name': str(df.iloc[i].PLAYER_NAME),
-    'team': str(df.iloc[i].TEAM_ABBREVIATION),
-    'games': str(df.iloc[i].GP),
-    'minutes': str(df.iloc[i].MIN),
-    'miles': str(df.iloc[i].DIST_MILES),
-    'avg_speed': str(df.iloc[i].AVG_SPEED),
-    'marathons': str(df.iloc[i].DIST_MARATHONS),
-    'miles_per_game': str(df.iloc[i].MILES_PER_GAME),
-    'miles_per_thirty': str(df.iloc[i].MILES_PER_36)}
-    for i in range(len(df))]
-
-  with open('distance.yml', 'w') as stream:
-    yaml.dump(distance_yaml_list, stream)
-
-
-def main():
-  # Request and save data
-  categories = ['MOREYBALL', 'PTS', 'REB', 'AST'] # Taking out the Moreyball category until I figure out what's causing the timeout
-  for category in categories:
-    if category == 'PTS':
-      for mode in ['PerGame', 'Totals']:
-        data = get_league_leaders(category, mode, top_n=1000 if mode == 'Totals' else 50)
-        save_to_csv(data.head(50) if mode == 'Totals' else data, category, mode)
-
-      players = playerindex.PlayerIndex(
-        active_nullable=1
-      ).get_data_frames()[0]
-
-      jers = data.merge(
-        players[['PERSON_ID', 'JERSEY_NUMBER']],
-        left_on='PLAYER_ID', right_on='PERSON_ID', how='left',
-      ).drop(columns=['PLAYER_ID', 'RANK', 'PLAYER', 'TEAM_ID', 'TEAM', 'PERSON_ID', 'FG_PCT', 'FG3_PCT', 'FT_PCT'])
-
-      g = jers.groupby('JERSEY_NUMBER')
-      jers = g.sum(numeric_only=True)
-      jers['COUNT'] = g.size()
-      jers['MPG'] = jers.MIN / jers.GP
-      jers['PPG'] = jers.PTS / jers.GP
-      jers['APG'] = jers.AST / jers.GP
-      jers['RPG'] = jers.REB / jers.GP
- 
-      jers.to_csv('data/dynamic/Jerseys.csv')
-      jers = jers.reset_index()
-
-      jers_data = [{
-        'jersey': str(jers.iloc[i].JERSEY_NUMBER),
-        'count': str(jers.iloc[i].COUNT),
-        'MPG': str(jers.iloc[i].MPG),
-        'PPG': str(jers.iloc[i].PPG),
-        'APG': str(jers.iloc[i].APG),
-        'RPG': str(jers.iloc[i].RPG),
-        'MIN': str(jers.iloc[i].MIN),
-        'GP': str(jers.iloc[i].GP),
-        'PTS': str(jers.iloc[i].PTS),
-        'AST': str(jers.iloc[i].AST),
-        'REB': str(jers.iloc[i].REB),
-        'FGA': str(jers.iloc[i].FGA),
-        'FGM': str(jers.iloc[i].FGM),
-      } for i in range((len(jers)))]
-
-      with open ('jerseys.yml', 'w') as stream:
-        yaml.dump(jers_data, stream, sort_keys=False, default_flow_style=False)
-
-    elif category == 'MOREYBALL':
-      try:
-        data = get_shooting_data()
-        mb_leader_name = data.iloc[0,1]
-        save_to_csv(data, category, 'Rate')
-
-        # Save .yml file for Moreyball data
-        mb_full_yaml_list =  [{
-          'id': str(data.iloc[i].PLAYER_ID),
-          'name': str(data.iloc[i].PLAYER_NAME),
-          'team': str(data.iloc[i].TEAM_ABBREVIATION),
-          'RA_FGM': str(data.iloc[i]['Restricted Area_FGM']),
-          'RA_FGA': str(data.iloc[i]['Restricted Area_FGA']),
-          'RA_PCT': str(data.iloc[i]['Pct RA_FGA']),
-          'THREE_FGM': str(data.iloc[i]['Total from 3_FGM']),
-          'THREE_FGA': str(data.iloc[i]['Total from 3_FGA']),
-          'THREE_PCT': str(data.iloc[i]['Pct 3_FGA']),
-          'MB_FGM': str(data.iloc[i]['Total from 3_FGM'] + data.iloc[i]['Restricted Area_FGM']),
-          'MB_FGA': str(data.iloc[i]['Total from 3_FGA'] + data.iloc[i]['Restricted Area_FGA']),
-          'TOTAL_FGM': str(data.iloc[i]['Total Shots_FGM']),
-          'TOTAL_FGA': str(data.iloc[i]['Total Shots_FGA']),
-          'MB_PCT': str(data.iloc[i]['Pct Moreyball_FGA'])} 
-          for i in range((len(data) - 1))]
-
-        with open('moreyball_full.yml', 'w') as stream:
-          yaml.dump(mb_full_yaml_list, stream)
-
-      except  Exception as e:
-        print(f"Moreyball data not saved: {e}")
-    else:
-      data = get_league_leaders(category, 'PerGame')
-      save_to_csv(data, category, 'PerGame')
-
-  # Plot Moreyball leader
-  mbPlot = CourtPlot(mb_leader_name, bg="#e4dbcd", ec="#403126", fc="#efd5b9")
+  write_yaml(df, 'distance.yml', DISTANCE_FIELDS)
+
+
+def get_player_index():
+  """Fetch the active player index (jersey numbers, bio details), once per process."""
+  from utils.Reference import reference
+
+  return reference().player_index
+
+
+# csv and yml files for each cohort of utils.Cohorts; the yml key for its label is the cohort name
+COHORT_FILES = {
+  'jersey': ('data/dynamic/Jerseys.csv', 'jerseys.yml'),
+  'draft_year': ('data/dynamic/Cohorts_Draft_Year.csv', 'cohorts_draft_year.yml'),
+  'college': ('data/dynamic/Cohorts_College.csv', 'cohorts_college.yml'),
+  'country': ('data/dynamic/Cohorts_Country.csv', 'cohorts_country.yml'),
+  'position': ('data/dynamic/Cohorts_Position.csv', 'cohorts_position.yml'),
+  'height': ('data/dynamic/Cohorts_Height.csv', 'cohorts_height.yml'),
+}
+
+
+def save_cohorts(data, players, attributes=None):
+  """Aggregate the season totals over each cohort of COHORT_FILES (or just `attributes`) and save csv and yml files."""
+  from utils.Cohorts import Cohorts
+
+  # One match of the totals against the player index, shared by every cohort
+  cohorts = Cohorts(data, players)
+  for attribute in attributes or COHORT_FILES:
+    csv_name, yml_name = COHORT_FILES[attribute]
+    table = cohorts.table(attribute)
+    table.to_csv(csv_name)
+    table = table.reset_index()
+    write_yaml(table, yml_name, {attribute: table.columns[0], **COHORT_FIELDS}, sort_keys=False)
+
+
+def save_moreyball(data):
+  """Save the Moreyball rankings to csv and yml files."""
+
+  save_to_csv(data, 'MOREYBALL', 'Rate')
+
+  # Save .yml file for Moreyball data
+  write_yaml(data, 'moreyball_full.yml', MOREYBALL_FIELDS)
+
+
+def moreyball_leader(data):
+  """Name of the Moreyball leader."""
+
+  return data.iloc[0,1]
+
+
+def plot_inputs(mbPlot):
+  # What the chart shows. The "as of" date is left out, so a quiet week keeps last week's chart
+  return mbPlot.player_name, mbPlot.shots_df
+
+
+def moreyball_plot(name, shot_index, render):
+  """
+  Set up the Moreyball leader's shot chart, downloading the headshot ahead of plotting if the `render`
+  stage is going to redraw it.
+  """
+  from utils.CourtPlot import CourtPlot
+  from utils.Headshots import get_store
+
+  mbPlot = CourtPlot(name, bg="#e4dbcd", ec="#403126", fc="#efd5b9", shot_index=shot_index)
+  if not render.fresh(mbPlot):
+    get_store().get(mbPlot.player_id)
+  return mbPlot
+
+
+def render_moreyball(mbPlot):
   mbPlot.plot_shots(title_text="Moreyball Pct. League Leader",
                     subtitle_text=mbPlot.player_name + " (as of {date}, min. 100 FGA)".format(date=datetime.today().strftime('%Y-%m-%d')),
                     save_plot=True)
-  
-  # Get distance leaders data
-  distance_leaders()
 
-  # Get shooting distance data
-  get_shots_yml()
+
+def season_leaders(season):
+  """The season's Totals table, which every leaderboard is derived from."""
+  from utils.Leaderboard import get_totals
+  return get_totals(season)
+
+
+def season_distance(season):
+  return distance_table(get_distance_data(season))
+
+
+def season_shot_distance(season):
+  from utils.ShotDistance import fetch_shots, shot_distances
+  return shot_distances(fetch_shots(season=season))
+
+
+# Boards kept in the history store (data/history), and how to fetch each for a past season
+HISTORY_BOARDS = {
+  'leaders': season_leaders,
+  'moreyball': get_shooting_data,
+  'distance': season_distance,
+  'shot_distance': season_shot_distance,
+}
+
+
+# Leaderboards written to data/dynamic, as (category, per mode)
+LEADER_BOARDS = [(c, 'PerGame') for c in LEADER_CATEGORIES] + [('PTS', 'Totals')]
+
+# The stage tasks each subcommand runs; whatever they depend on runs too
+COMMANDS = {
+  'leaders': [f'save_{category}_{per_mode}' for category, per_mode in LEADER_BOARDS] + ['history_leaders'],
+  'moreyball': ['save_moreyball', 'history_moreyball'],
+  'distance': ['distance_leaders', 'history_distance'],
+  'shot-distance': ['shot_distance', 'history_shot_distance'],
+  'cohorts': ['cohorts'],
+  'jerseys': ['cohorts'],
+  'plot': ['moreyball_plot'],
+}
+
+
+def main(offline=False, changed_list=None, command=None):
+  """Run the whole pipeline, or just one of the COMMANDS and the stages it needs."""
+  from utils import StatsHTTP
+  from utils.History import HistoryStore, current_season
+
+  # Repeat requests are answered from the on-disk cache; offline replays the last run without network.
+  # Every request that does go to stats.nba.com, retries included, takes a token from its rate limit.
+  StatsHTTP.install(offline=offline, bucket=TokenBucket(*DEFAULT_RATES[STATS_HOST]))
+
+  # Stage timings and every request's latency, size and status go into data/profiles/<start time>.json
+  profile = get_profile()
+  StatsHTTP.request_hooks.append(profile.request)
+
+  # Stages run fetch -> transform -> emit -> render. Emit and render stages are skipped when
+  # the hash of their inputs matches the manifest, so a quiet week rewrites and redraws nothing.
+  pipeline = Pipeline()
+
+  # Requests that don't depend on each other run concurrently; each processing stage
+  # starts as soon as the data it needs has arrived. Only the CDN is limited per task.
+  scheduler = FetchScheduler(max_workers=4, rates={CDN_HOST: DEFAULT_RATES[CDN_HOST]}, default_deadline=180, profile=profile)
+
+  # Every board is fetched for the same season, which NBA_SEASON_END pins after the season ends
+  season = current_season()
+
+  # Every leaderboard is derived from a single Totals request, with the team dashboard's games
+  # played deciding who qualifies for the per game boards
+  scheduler.add('totals', partial(lazy('utils.Leaderboard', 'get_totals'), season), host=STATS_HOST)
+  scheduler.add('team_games', partial(lazy('utils.Leaderboard', 'get_team_games'), season), host=STATS_HOST)
+  scheduler.add('leaderboard', lazy('utils.Leaderboard', 'Leaderboard'), deps=['totals', 'team_games'])
+  for category, per_mode in LEADER_BOARDS:
+    scheduler.add(f'{category}_{per_mode}', lambda board, category=category, per_mode=per_mode: board.top(category, per_mode),
+                  deps=['leaderboard'])
+    scheduler.add(f'save_{category}_{per_mode}',
+                  pipeline.stage(f'save_{category}_{per_mode}', partial(save_to_csv, category=category, per_mode=per_mode),
+                                 outputs=[leaders_csv(category, per_mode)]),
+                  deps=[f'{category}_{per_mode}'])
+  scheduler.add('player_index', get_player_index, host=STATS_HOST)
+  scheduler.add('cohorts', pipeline.stage('cohorts', save_cohorts, outputs=[f for files in COHORT_FILES.values() for f in files]),
+                deps=['totals', 'player_index'])
+
+  # Moreyball is the known timeout source, so a failure here shouldn't sink the rest of the run
+  scheduler.add('moreyball', partial(get_shooting_data, season), host=STATS_HOST, optional=True)
+  scheduler.add('save_moreyball',
+                pipeline.stage('save_moreyball', save_moreyball, outputs=[leaders_csv('MOREYBALL', 'Rate'), 'moreyball_full.yml']),
+                deps=['moreyball'], optional=True)
+  scheduler.add('moreyball_leader', moreyball_leader, deps=['moreyball'], optional=True)
+  render = pipeline.stage('render_moreyball', render_moreyball, outputs=['plot.png'], key=plot_inputs)
+  scheduler.add('moreyball_plot', partial(moreyball_plot, render=render),
+                deps=['moreyball_leader', 'shot_index'], host=CDN_HOST, optional=True)
+
+  scheduler.add('distance', partial(get_distance_data, season), host=STATS_HOST)
+  scheduler.add('distance_table', distance_table, deps=['distance'])
+  scheduler.add('distance_leaders',
+                pipeline.stage('distance_leaders', distance_leaders, outputs=['data/dynamic/NBA_Leaders_Distance.csv', 'distance.yml']),
+                deps=['distance_table'])
+
+  scheduler.add('shots', partial(lazy('utils.ShotDistance', 'fetch_shots'), incremental=True, season=season, offline=offline),
+                host=STATS_HOST, deadline=300)
+  scheduler.add('shot_distances', lazy('utils.ShotDistance', 'shot_distances'), deps=['shots'])
+  scheduler.add('shot_distance',
+                pipeline.stage('shot_distance', partial(lazy('utils.ShotDistance', 'save_shot_distances'), season=season),
+                               outputs=[f'SHOOTING_DISTANCE_{season[2:]}.csv', 'shot_distance.yml']),
+                deps=['shot_distances'])
+  # Player shot charts are sliced out of the league frame instead of being requested again
+  scheduler.add('shot_index', lazy('utils.ShotIndex', 'ShotIndex'), deps=['shots'])
+
+  # Today's numbers also go into the history store, next to any backfilled seasons
+  history = HistoryStore()
+  snapshot = datetime.today().strftime('%Y-%m-%d')
+  for board, dep in [('leaders', 'totals'), ('moreyball', 'moreyball'), ('distance', 'distance_table'), ('shot_distance', 'shot_distances')]:
+    scheduler.add(f'history_{board}', partial(history.write, board, season, snapshot), deps=[dep], optional=True)
+
+  try:
+    results = scheduler.run(only=COMMANDS[command] if command else None)
+
+    # Plot Moreyball leader (matplotlib stays on the main thread)
+    if 'moreyball_plot' in results:
+      with profile.stage('render_moreyball'):
+        render(results['moreyball_plot'])
+  finally:
+    # Whatever finished is recorded, so the next run only redoes what didn't
+    pipeline.save(changed_list)
+    profile.write()
 
 
 if __name__ == "__main__":
-  main()
\ No newline at end of file
+  parser = argparse.ArgumentParser(description="Fetch league leader data and write the site's csv/yml files.")
+  parser.add_argument('--offline', action='store_true', help="Replay cached API responses instead of hitting the network")
+  parser.add_argument('--changed-list', help="Write the artifacts that changed this run to this file, one per line")
+  # DEBUG logs every request (and whether the response cache answered it), urllib3's included
+  parser.add_argument('--log-level', default='WARNING', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
+  commands = parser.add_subparsers(dest='command', metavar='command', help="run one stage (default: everything)")
+  commands.add_parser('leaders', help="points, rebounds and assists leaderboards")
+  commands.add_parser('moreyball', help="Moreyball rankings (moreyball_full.yml)")
+  commands.add_parser('distance', help="distance travelled leaders (distance.yml)")
+  commands.add_parser('shot-distance', help="average shot distances (shot_distance.yml)")
+  commands.add_parser('cohorts', aliases=['jerseys'], help="totals by jersey number (jerseys.yml), draft year, college, country, position and height")
+  commands.add_parser('plot', help="the Moreyball leader's shot chart (plot.png)")
+  backfill_parser = commands.add_parser('backfill', help="fetch past seasons into the history store (data/history)")
+  backfill_parser.add_argument('first', help="first season, e.g. 2015-16")
+  backfill_parser.add_argument('last', nargs='?', help="last season (default the current one)")
+  backfill_parser.add_argument('--boards', nargs='+', choices=list(HISTORY_BOARDS), default=list(HISTORY_BOARDS))
+  backfill_parser.add_argument('--processes', type=int, default=2)
+  args = parser.parse_args()
+
+  logging.basicConfig(level=args.log_level)
+  if args.command == 'backfill':
+    from utils.History import backfill, current_season, season_range
+
+    errors = backfill({board: HISTORY_BOARDS[board] for board in args.boards}, season_range(args.first, args.last or current_season()),
+                      processes=args.processes, offline=args.offline)
+    raise SystemExit(1 if errors else 0)
+  main(offline=args.offline, changed_list=args.changed_list, command=args.command)
@@ -1,5 +1,6 @@
 import pandas as pd
 from nba_api.stats.endpoints import leaguedashplayershotlocations
+from utils import StatsHTTP
 
 def get_shooting_data():
   data = leaguedashplayershotlocations.LeagueDashPlayerShotLocations()
@@ -23,6 +24,7 @@ def save_to_csv(df, filename="data/dynamic/Moreyball_Ranking.csv"):
 
 
 def main():
+  StatsHTTP.install()
   try:
     shooting_df = get_shooting_data()
     processed_df = process_shooting_data(shooting_df)
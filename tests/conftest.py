@@ -0,0 +1,32 @@
+import pytest
+
+from nba_api.stats.endpoints import leaguedashplayershotlocations, shotchartdetail
+from nba_api.stats.library import http as http_module
+from nba_api.stats.library.http import NBAStatsResponse
+
+from utils import StatsHTTP
+
+
+class FakeNetwork:
+  # Answers every request that gets past the cache with `body`, noting the endpoint
+  def __init__(self):
+    self.body = None
+    self.requests = []
+
+  def send_api_request(self, http, endpoint, parameters, *args, **kwargs):
+    self.requests.append(endpoint)
+    return NBAStatsResponse(self.body, 200, f"https://stats.nba.com/stats/{endpoint}")
+
+
+@pytest.fixture
+def network(monkeypatch, tmp_path):
+  """Endpoints routed through CachedNBAStatsHTTP, with an empty cache in tmp_path and a FakeNetwork behind it."""
+  fake = FakeNetwork()
+  monkeypatch.setattr(StatsHTTP.NBAStatsHTTP, 'send_api_request',
+                      lambda http, *args, **kwargs: fake.send_api_request(http, *args, **kwargs))
+  monkeypatch.setattr(StatsHTTP.CachedNBAStatsHTTP, 'cache', StatsHTTP.ResponseCache(tmp_path))
+  monkeypatch.setattr(StatsHTTP.CachedNBAStatsHTTP, 'offline', False)
+  monkeypatch.setattr(http_module, 'NBAStatsHTTP', StatsHTTP.CachedNBAStatsHTTP)
+  for module in (leaguedashplayershotlocations, shotchartdetail):
+    monkeypatch.setattr(module, 'NBAStatsHTTP', StatsHTTP.CachedNBAStatsHTTP)
+  return fake
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import yaml
+
+from utils.Artifacts import write_yaml
+from utils.Distance import DISTANCE_FIELDS
+
+
+def _distance_table(n):
+  rng = np.random.default_rng(0)
+  df = pd.DataFrame({
+    'PLAYER_ID': 1626000 + np.arange(n),
+    'PLAYER_NAME': [f"Player {i}" for i in range(n)],
+    'TEAM_ABBREVIATION': rng.choice(['BOS', 'DEN', 'OKC'], n),
+    'GP': rng.integers(1, 82, n),
+    'MIN': rng.uniform(200, 3000, n),
+    'DIST_MILES': rng.uniform(10, 200, n),
+    'AVG_SPEED': rng.uniform(3.5, 5, n),
+  })
+  df['DIST_MARATHONS'] = df.DIST_MILES / 26.219
+  df['MILES_PER_GAME'] = df.DIST_MILES / df.GP
+  df['MILES_PER_36'] = df.DIST_MILES / df.MIN * 36
+  return df.sort_values('MILES_PER_36', ascending=False)
+
+
+def test_write_yaml_writes_every_row_across_chunks(tmp_path):
+  df = _distance_table(2501)
+  path = tmp_path / "distance.yml"
+  write_yaml(df, path, DISTANCE_FIELDS, chunk_size=1000)
+
+  with open(path) as f:
+    written = yaml.safe_load(f)
+
+  assert len(written) == len(df)
+  for record, row in [(written[0], df.iloc[0]), (written[-1], df.iloc[-1])]:
+    assert record == {key: str(row[column]) for key, column in DISTANCE_FIELDS.items()}
+
+
+def test_write_yaml_empty_frame(tmp_path):
+  path = tmp_path / "empty.yml"
+  write_yaml(_distance_table(0), path, DISTANCE_FIELDS)
+  assert yaml.safe_load(path.read_text()) == []
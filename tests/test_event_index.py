@@ -0,0 +1,24 @@
+import pandas as pd
+
+from benchmarks.synthetic import EVENTS_PER_GAME, play_by_play
+from utils.EventIndex import EventIndex
+
+
+def test_resolve_games_leaves_repeated_date_team_pairs_unresolved():
+  # Three games on one date, as home/away (A, B), (B, C), (C, D): only A and D are there once
+  pbp = play_by_play(3 * EVENTS_PER_GAME)
+  first, second, third = pbp['GAME_ID'].unique()
+  a, b, c, d = 'AAA', 'BBB', 'CCC', 'DDD'
+  pbp['GAME_DATE'] = '2025-01-01'
+  pbp['HOME_TEAM'] = pbp['GAME_ID'].map({first: a, second: b, third: c})
+  pbp['AWAY_TEAM'] = pbp['GAME_ID'].map({first: b, second: c, third: d})
+
+  events = pd.DataFrame({
+    'GAME_DATE': ['2025-01-01'] * 4 + ['2025-01-02'],
+    'HOME_TEAM': [a, b, c, b, a],
+    'AWAY_TEAM': [b, c, d, a, b],
+  }, index=[10, 11, 12, 13, 14])
+  game_ids = EventIndex(pbp).resolve_games(events)
+
+  assert game_ids.index.equals(events.index)
+  assert game_ids.where(game_ids.notna(), None).tolist() == [first, None, third, first, None]
@@ -0,0 +1,16 @@
+import pytest
+
+from utils.Files import atomic_write
+
+
+def test_failed_write_keeps_the_old_file(tmp_path):
+  path = tmp_path / "out" / "data.txt"
+  with atomic_write(path) as tmp:
+    tmp.write_text("old")
+
+  with pytest.raises(RuntimeError):
+    with atomic_write(path) as tmp:
+      tmp.write_text("half")
+      raise RuntimeError("interrupted")
+  assert path.read_text() == "old"
+  assert [p.name for p in path.parent.iterdir()] == ["data.txt"]
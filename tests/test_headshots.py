@@ -0,0 +1,25 @@
+import json
+import time
+
+from PIL import Image
+
+from utils.Headshots import HeadshotStore
+
+
+def _stored(path, player_ids):
+  # Thumbnails already on disk and recently checked, so get() loads them without a request
+  path.mkdir(parents=True, exist_ok=True)
+  for player_id in player_ids:
+    Image.new('RGB', (4, 4)).save(path / f"{player_id}.png")
+    (path / f"{player_id}.json").write_text(json.dumps({'checked_at': time.time()}))
+
+
+def test_images_in_memory_are_bounded(tmp_path):
+  _stored(tmp_path, range(5))
+  store = HeadshotStore(tmp_path, max_images=3)
+
+  for player_id in [0, 1, 2, 0, 3, 4]:
+    assert store.get(player_id) is not None
+
+  # 1 and 2 were used least recently; 0 was used again before 3 and 4 arrived
+  assert list(store._images) == [0, 3, 4]
@@ -0,0 +1,30 @@
+import pandas as pd
+
+from utils.History import HistoryStore
+
+
+def _board(points):
+  return pd.DataFrame({'PLAYER_ID': [1, 2], 'PLAYER_NAME': ['A', 'B'], 'PTS': points})
+
+
+def test_unchanged_snapshots_are_not_stored_again(tmp_path):
+  store = HistoryStore(tmp_path)
+
+  assert store.write('leaders', '2025-26', '2026-01-05', _board([10, 20])) == 2
+  assert store.write('leaders', '2025-26', '2026-01-12', _board([10, 20])) == 0
+  assert store.write('leaders', '2025-26', '2026-01-19', _board([15, 20])) == 2
+
+  assert store.snapshots('leaders') == [('2025-26', '2026-01-05'), ('2025-26', '2026-01-19')]
+  as_of = store.leaders('leaders', 'PTS', '2025-26', as_of='2026-01-12')
+  assert as_of['SNAPSHOT'].tolist() == ['2026-01-05', '2026-01-05']
+  assert as_of['PTS'].tolist() == [20, 10]
+
+
+def test_rewriting_a_day_back_to_the_previous_numbers_drops_it(tmp_path):
+  store = HistoryStore(tmp_path)
+  store.write('leaders', '2025-26', '2026-01-05', _board([10, 20]))
+  store.write('leaders', '2025-26', '2026-01-12', _board([11, 20]))
+
+  assert store.write('leaders', '2025-26', '2026-01-12', _board([10, 20])) == 0
+  assert store.snapshots('leaders') == [('2025-26', '2026-01-05')]
+  assert not (tmp_path / 'leaders' / 'SEASON=2025-26' / 'SNAPSHOT=2026-01-12').exists()
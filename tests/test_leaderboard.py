@@ -0,0 +1,32 @@
+import pandas as pd
+
+from utils.Leaderboard import Leaderboard
+
+
+def _totals():
+  # Team 1 has played 40 games. Its new signing played 50 games in all, most of them for another team.
+  return pd.DataFrame({
+    'PLAYER_ID': [1, 2, 3],
+    'RANK': [1, 2, 3],
+    'PLAYER': ['Traded', 'Regular', 'Other'],
+    'TEAM_ID': [1, 1, 2],
+    'TEAM': ['AAA', 'AAA', 'BBB'],
+    'GP': [50, 30, 45],
+    'MIN': [1500, 900, 1350],
+    'PTS': [1000, 900, 450],
+  })
+
+
+def test_qualifying_uses_team_games_played():
+  board = Leaderboard(_totals(), pd.Series({1: 40, 2: 48}))
+
+  # 70% of 40 is 28 games for team 1, whatever the traded player's total; 70% of 48 rounds up to 34 for team 2
+  assert board.qualified.tolist() == [True, True, True]
+  assert board.top('PTS', 'PerGame')['PLAYER'].tolist() == ['Regular', 'Traded', 'Other']
+
+
+def test_qualifying_without_team_games_uses_league_games():
+  board = Leaderboard(_totals())
+
+  # The most games anyone has played, 50, stands in for every team's: 35 needed
+  assert board.qualified.tolist() == [True, False, True]
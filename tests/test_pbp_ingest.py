@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+from utils import PBPIngest
+from utils.PBPIngest import EmptyPlayByPlay, PBPStore, fetch_game
+
+
+class FakePlayByPlay:
+  events = pd.DataFrame()
+
+  def __init__(self, game_id):
+    self.game_id = game_id
+
+  def get_data_frames(self):
+    return [self.events]
+
+
+@pytest.fixture
+def game(monkeypatch):
+  monkeypatch.setattr(PBPIngest.playbyplayv2, 'PlayByPlayV2', FakePlayByPlay)
+  return pd.DataFrame({'GAME_ID': ['0022400001'], 'GAME_DATE': ['2025-01-01'],
+                       'AWAY_TEAM': ['BOS'], 'HOME_TEAM': ['NYK']}).iloc[0]
+
+
+def test_empty_play_by_play_is_not_stored(game, tmp_path, monkeypatch):
+  store = PBPStore('2024-25', tmp_path)
+  monkeypatch.setattr(FakePlayByPlay, 'events', pd.DataFrame(columns=['GAME_ID', 'EVENTNUM']))
+
+  with pytest.raises(EmptyPlayByPlay):
+    fetch_game(game, store)
+  assert game.GAME_ID not in store
+
+
+def test_play_by_play_is_stored_with_game_details(game, tmp_path, monkeypatch):
+  store = PBPStore('2024-25', tmp_path)
+  monkeypatch.setattr(FakePlayByPlay, 'events', pd.DataFrame({'GAME_ID': [game.GAME_ID] * 2, 'EVENTNUM': [1, 2]}))
+
+  assert fetch_game(game, store) == 2
+  assert store.read()[['EVENTNUM', 'HOME_TEAM']].values.tolist() == [[1, 'NYK'], [2, 'NYK']]
+
+
+def test_ingest_keeps_the_offline_setting(tmp_path, monkeypatch):
+  installed = {}
+  monkeypatch.setattr(PBPIngest.StatsHTTP, 'install', lambda **kwargs: installed.update(kwargs))
+  monkeypatch.setattr(PBPIngest, 'get_games', lambda season, last_n_days: pd.DataFrame(columns=PBPIngest.GAME_FIELDS))
+
+  PBPIngest.ingest_pbp('2024-25', store=PBPStore('2024-25', tmp_path), offline=True)
+  assert installed['offline'] is True
@@ -0,0 +1,60 @@
+from functools import partial
+
+import pandas as pd
+
+from utils.Pipeline import Pipeline, bound_arguments
+
+
+def _write(df, path, season=None):
+  with open(path, 'w') as f:
+    f.write(f"{season}\n{df.to_csv()}")
+
+
+def test_stage_reruns_when_bound_keywords_change(tmp_path):
+  pipeline = Pipeline(tmp_path / "manifest.json")
+  out = tmp_path / "out.csv"
+  df = pd.DataFrame({'PTS': [1, 2]})
+
+  for season in ['2024-25', '2024-25', '2025-26']:
+    pipeline.stage('save', partial(_write, path=str(out), season=season), outputs=[out])(df)
+
+  assert pipeline.ran == ['save', 'save']
+  assert pipeline.skipped == ['save']
+  assert out.read_text().startswith('2025-26')
+
+
+def test_bound_arguments_of_nested_partials():
+  fn = partial(partial(_write, 1, season='a'), 2, season='b', path='p')
+  assert bound_arguments(fn) == {'args': [1, 2], 'keywords': {'season': 'b', 'path': 'p'}}
+  assert bound_arguments(_write) == {'args': [], 'keywords': {}}
+
+
+class FakeCourtPlot:
+  # The parts of CourtPlot the Moreyball chart's inputs come from
+  def __init__(self, name, **kwargs):
+    self.player_name = name
+    self.player_id = 201939
+    self.shots_df = pd.DataFrame({'LOC_X': [0, 10], 'LOC_Y': [5, 250], 'SHOT_MADE_FLAG': [1, 0]})
+
+
+def test_skipped_render_fetches_no_headshot(tmp_path, monkeypatch):
+  import leagueleaders
+  from utils import CourtPlot, Headshots
+
+  fetched = []
+  monkeypatch.setattr(CourtPlot, 'CourtPlot', FakeCourtPlot)
+  monkeypatch.setattr(Headshots, 'get_store', lambda: type('Store', (), {'get': lambda self, i: fetched.append(i)})())
+  plot = tmp_path / "plot.png"
+
+  def runs():
+    pipeline = Pipeline(tmp_path / "manifest.json")
+    render = pipeline.stage('render_moreyball', lambda p: plot.write_text(p.player_name),
+                            outputs=[plot], key=leagueleaders.plot_inputs)
+    render(leagueleaders.moreyball_plot("Stephen Curry", None, render))
+    pipeline.save()
+    return pipeline
+
+  first, second = runs(), runs()
+
+  assert first.ran == ['render_moreyball'] and second.skipped == ['render_moreyball']
+  assert fetched == [201939]
@@ -0,0 +1,58 @@
+import gzip
+import json
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import FIXTURE_DIR, shot_chart
+from utils import StatsHTTP
+from utils.ShotStore import ShotStore, ingest_shots
+
+
+def _contents(store):
+  return {p: p.read_bytes() for p in sorted(store.root.glob('GAME_DATE=*/shots.parquet'))}
+
+
+def test_storing_the_same_shots_again_leaves_partitions_unchanged(tmp_path):
+  store = ShotStore('2024-25', tmp_path)
+  shots = shot_chart(3000)
+  store.write(shots)
+  before = _contents(store)
+
+  # The next run fetches the last stored date again
+  store.write(shots[shots.GAME_DATE == store.last_game_date()])
+
+  assert _contents(store) == before
+
+
+def test_offline_ingest_serves_the_stored_shots(network, tmp_path, monkeypatch):
+  with gzip.open(FIXTURE_DIR / "shotchartdetail.json.gz", 'rt', encoding='utf-8') as f:
+    network.body = f.read()
+  store = ShotStore('2024-25', tmp_path / "shots")
+  shots = shot_chart(5000)
+  store.write(shots[shots.GAME_DATE == shots.GAME_DATE.min()])
+
+  # An online run requests the games since the first date, moving the store's last date on
+  stored = ingest_shots('2024-25', store)
+  assert len(network.requests) == 1
+
+  # So the request an offline run would make was never made online, and isn't cached
+  monkeypatch.setattr(StatsHTTP.CachedNBAStatsHTTP, 'offline', True)
+  with pytest.raises(StatsHTTP.OfflineCacheMiss):
+    ingest_shots('2024-25', store)
+  offline = ingest_shots('2024-25', store, offline=True)
+
+  assert len(network.requests) == 1
+  assert offline.equals(stored)
+
+
+def test_recorded_fixture_is_stored_whole(tmp_path):
+  # Every synthetic shot has its own (GAME_ID, GAME_EVENT_ID), so the store keeps them all
+  with gzip.open(FIXTURE_DIR / "shotchartdetail.json.gz", 'rt', encoding='utf-8') as f:
+    body = json.load(f)
+  result_set = body['resultSets'][0]
+  shots = pd.DataFrame(result_set['rowSet'], columns=result_set['headers'])
+
+  store = ShotStore('2024-25', tmp_path)
+  store.write(shots)
+  assert len(store.read()) == len(shots) == 5000
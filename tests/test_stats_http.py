@@ -0,0 +1,89 @@
+import gzip
+import json
+
+import pytest
+
+from nba_api.stats.endpoints import leaguedashplayershotlocations, shotchartdetail
+from nba_api.stats.endpoints._base import Endpoint
+from nba_api.stats.library.http import NBAStatsResponse
+from pandas.testing import assert_frame_equal
+
+from benchmarks.synthetic import FIXTURE_DIR
+from utils import StatsHTTP
+
+
+def _body(name):
+  with gzip.open(FIXTURE_DIR / name, 'rt', encoding='utf-8') as f:
+    return f.read()
+
+
+def _expected(body, name):
+  # What nba_api builds from the body with none of StatsHTTP in the way
+  return Endpoint.DataSet(data=NBAStatsResponse(body, 200, None).get_data_sets()[name]).get_data_frame()
+
+
+def test_multiindex_headers_fall_back_to_a_full_decode(network):
+  # LeagueDashPlayerShotLocations has two header levels, which the streaming parser leaves to nba_api
+  network.body = _body("leaguedashplayershotlocations.json.gz")
+  expected = _expected(network.body, 'ShotLocations')
+
+  fresh = leaguedashplayershotlocations.LeagueDashPlayerShotLocations(season='2024-25')
+  cached = leaguedashplayershotlocations.LeagueDashPlayerShotLocations(season='2024-25')
+
+  assert network.requests == ['leaguedashplayershotlocations']
+  for endpoint in (fresh, cached):
+    assert isinstance(endpoint.nba_response, StatsHTTP.StreamingNBAStatsResponse)
+    assert_frame_equal(endpoint.shot_locations.get_data_frame(), expected)
+    assert endpoint.get_dict() == json.loads(network.body)
+    assert endpoint.nba_response.valid_json()
+
+
+def test_streamed_result_sets_match_nba_api(network):
+  network.body = _body("shotchartdetail.json.gz")
+  expected = _expected(network.body, 'Shot_Chart_Detail')
+
+  fresh = shotchartdetail.ShotChartDetail(team_id=0, player_id=0, context_measure_simple='FGA')
+  cached = shotchartdetail.ShotChartDetail(team_id=0, player_id=0, context_measure_simple='FGA')
+
+  assert network.requests == ['shotchartdetail']
+  for endpoint in (fresh, cached):
+    assert_frame_equal(endpoint.shot_chart_detail.get_data_frame(), expected)
+    assert len(endpoint.get_normalized_dict()['Shot_Chart_Detail']) == len(expected)
+
+
+def test_request_size_is_reported_in_bytes(network, monkeypatch):
+  reported = []
+  monkeypatch.setattr(StatsHTTP, 'request_hooks', [lambda *record: reported.append(record)])
+  result_sets = [{'name': name, 'headers': ['PLAYER_NAME'], 'rowSet': [['Luka Dončić']]}
+                 for name in ('Shot_Chart_Detail', 'LeagueAverages')]
+  network.body = json.dumps({'resource': 'shotchartdetail', 'parameters': {}, 'resultSets': result_sets}, ensure_ascii=False)
+
+  shotchartdetail.ShotChartDetail(team_id=0, player_id=0, context_measure_simple='FGA')
+
+  assert reported[0][3] == len(network.body.encode('utf-8'))
+
+
+class CountingBucket:
+  def __init__(self):
+    self.tokens = 0
+
+  def acquire(self):
+    self.tokens += 1
+
+
+def test_every_network_request_takes_a_token(network, monkeypatch):
+  bucket = CountingBucket()
+  monkeypatch.setattr(StatsHTTP.CachedNBAStatsHTTP, 'bucket', bucket)
+  network.body = _body("shotchartdetail.json.gz")
+
+  # Two requests in one task, one of them repeated from the cache, then a failed request and its retry
+  shotchartdetail.ShotChartDetail(team_id=0, player_id=0, context_measure_simple='FGA')
+  shotchartdetail.ShotChartDetail(team_id=0, player_id=0, context_measure_simple='FGA')
+  shotchartdetail.ShotChartDetail(team_id=0, player_id=1, context_measure_simple='FGA')
+  network.body = '<html>Service Unavailable</html>'
+  for attempt in range(2):
+    with pytest.raises(Exception):
+      shotchartdetail.ShotChartDetail(team_id=0, player_id=2, context_measure_simple='FGA')
+
+  assert len(network.requests) == 4
+  assert bucket.tokens == 4
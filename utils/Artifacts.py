@@ -0,0 +1,44 @@
+import yaml
+
+from utils.Profile import timed
+
+# The LibYAML emitter is much faster and writes the same output as the pure-Python one
+try:
+  from yaml import CDumper as Dumper
+except ImportError:
+  from yaml import Dumper
+
+
+def records(df, fields):
+  """
+  Yield one dict per row of `df`, built from the `fields` mapping of output key to source.
+  A source is a column name, a function of the whole frame returning a column, or a
+  (source, formatter) pair; the default formatter is `str`. Columns are converted in bulk,
+  never a row at a time.
+  """
+  columns = []
+  for key, source in fields.items():
+    source, formatter = source if isinstance(source, tuple) else (source, str)
+    values = source(df) if callable(source) else df[source]
+    columns.append((key, [formatter(v) for v in values.tolist()]))
+
+  for i in range(len(df)):
+    yield {key: values[i] for key, values in columns}
+
+
+@timed()
+def write_yaml(df, path, fields, sort_keys=True, chunk_size=1000):
+  """Write every row of `df` to a yml list at `path`, streaming `chunk_size` records at a time."""
+  with open(path, 'w') as stream:
+    if df.empty:
+      yaml.dump([], stream, Dumper=Dumper)
+      return
+
+    chunk = []
+    for record in records(df, fields):
+      chunk.append(record)
+      if len(chunk) == chunk_size:
+        yaml.dump(chunk, stream, Dumper=Dumper, sort_keys=sort_keys, default_flow_style=False)
+        chunk = []
+    if chunk:
+      yaml.dump(chunk, stream, Dumper=Dumper, sort_keys=sort_keys, default_flow_style=False)
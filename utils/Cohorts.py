@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+from pandas.api.types import is_numeric_dtype
+
+
+def height_bucket(players, inches=2):
+  """HEIGHT ('6-7') as the start of its `inches` wide bucket, in inches (6-6 and 6-7 are both 78); None if missing."""
+  feet_inches = players['HEIGHT'].astype(str).str.extract(r'^(\d+)-(\d+)$').astype(float)
+  total = feet_inches[0] * 12 + feet_inches[1]
+  return (total // inches * inches).astype('Int64')
+
+
+# Cohort name -> the PlayerIndex column its players are grouped by, or a function of the index giving each player's label
+COHORT_ATTRIBUTES = {
+  'jersey': 'JERSEY_NUMBER',
+  'draft_year': 'DRAFT_YEAR',
+  'college': 'COLLEGE',
+  'country': 'COUNTRY',
+  'position': 'POSITION',
+  'height': height_bucket,
+}
+
+# Totals columns that aren't summed: identifiers, and percentages that don't add up
+NOT_SUMMED = ['PLAYER_ID', 'RANK', 'PLAYER', 'TEAM_ID', 'TEAM', 'FG_PCT', 'FG3_PCT', 'FT_PCT']
+
+# Per game rates added to every cohort, as (numerator, denominator) of summed columns
+COHORT_RATES = {
+  'MPG': ('MIN', 'GP'),
+  'PPG': ('PTS', 'GP'),
+  'APG': ('AST', 'GP'),
+  'RPG': ('REB', 'GP'),
+}
+
+
+class Cohorts:
+  """
+  Season totals summed over cohorts of players sharing a PlayerIndex attribute: jersey number,
+  draft year, college, country, position, height. Totals rows are matched to the index once and
+  each attribute is factorized once, so every cohort table is a single grouped reduction of the
+  stat columns over precomputed codes, with no further requests or merges.
+  """
+
+  def __init__(self, totals, players, attributes=COHORT_ATTRIBUTES):
+    self.players = players if players['PERSON_ID'].is_unique else players.drop_duplicates('PERSON_ID')
+    self.attributes = attributes
+    # Index row of every totals row, or -1 for players missing from the index
+    self._rows = pd.Index(self.players['PERSON_ID']).get_indexer(totals['PLAYER_ID'])
+
+    self.stats = [c for c in totals.columns if c not in NOT_SUMMED and is_numeric_dtype(totals[c])]
+    self._values = totals[self.stats].reset_index(drop=True)
+    self._codes = {}
+
+  def labels(self, attribute):
+    """Each index player's label for `attribute`."""
+    source = self.attributes[attribute]
+    return source(self.players) if callable(source) else self.players[source]
+
+  def codes(self, attribute):
+    """(group code of every totals row, -1 when unlabelled; sorted group labels) for `attribute`."""
+    if attribute not in self._codes:
+      codes, labels = pd.factorize(self.labels(attribute), sort=True)
+      rows = np.where(self._rows >= 0, codes[self._rows], -1)
+      # Only labels some totals row has make a group, as with a groupby on the merged frame
+      used = np.bincount(rows[rows >= 0], minlength=len(labels)) > 0
+      remap = np.cumsum(used) - 1
+      self._codes[attribute] = (np.where(rows >= 0, remap[rows], -1), labels[used])
+    return self._codes[attribute]
+
+  def table(self, attribute):
+    """
+    One row per label of `attribute`, in sorted order and indexed by its PlayerIndex column: every
+    summed stat, COUNT of players, and the COHORT_RATES. Players without a label are left out.
+    """
+    codes, labels = self.codes(attribute)
+
+    # Grouping on a categorical built from the codes is pandas' grouped sum without the merge or label
+    # hashing (code -1 drops out): integer stats stay exact, and float ones get the same compensated
+    # sums as a groupby on the labels would
+    groups = pd.Categorical.from_codes(codes, categories=range(len(labels)))
+    table = self._values.groupby(groups, observed=True).sum()
+    source = self.attributes[attribute]
+    table.index = pd.Index(labels, name=source if isinstance(source, str) else attribute.upper())
+    table['COUNT'] = np.bincount(codes[codes >= 0], minlength=len(labels))
+    for rate, (numerator, denominator) in COHORT_RATES.items():
+      table[rate] = table[numerator] / table[denominator]
+    return table
+
+  def tables(self, attributes=None):
+    """{attribute: table} for `attributes` (default every attribute)."""
+    return {a: self.table(a) for a in attributes or self.attributes}
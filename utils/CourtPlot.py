@@ -1,27 +1,39 @@
 
+import numpy as np
 import pandas as pd
-import requests
 
-from functools import wraps
-from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property, lru_cache, wraps
 from PIL import Image
 
+import matplotlib
 import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PolyCollection
+from matplotlib.colors import Normalize
+from matplotlib.figure import Figure
 import matplotlib.font_manager as fm
 from matplotlib.patches import Circle, Rectangle, Arc, Wedge
 from pathlib import Path
 
-from nba_api.stats.static import players
 from nba_api.stats.endpoints import shotchartdetail
 from nba_api.stats.library.parameters import Season
+from utils.Headshots import get_store
+from utils.Reference import reference
 
-# Setting Inter SemiBold as custom font
 font_path = Path(__file__).parent / "fonts/JetBrainsMono.ttf"
-fm.fontManager.addfont(str(font_path))
-custom_font = fm.FontProperties(fname=str(font_path)).get_name()
+
+@lru_cache(maxsize=None)
+def custom_font():
+    """Family name of the chart font, registering it with matplotlib the first time a chart needs it."""
+    fm.fontManager.addfont(str(font_path))
+    return fm.FontProperties(fname=str(font_path)).get_name()
+
+# Drawn courts reused by render_shots, keyed by colour scheme and figure size
+_court_templates = {}
 
 class CourtPlot:
-    def __init__(self, player_name, season=Season.current_season, bg='#F4F5EF', ac='#F5EEE4', ec='#2A4644', fc='#FBE9E2', percent=100):
+    def __init__(self, player_name, season=Season.current_season, bg='#F4F5EF', ac='#F5EEE4', ec='#2A4644', fc='#FBE9E2', percent=100, shot_index=None, grids=None):
         # Initialize attributes for player and court settings
         self.player_name = player_name
         self.season = season
@@ -30,14 +42,34 @@ class CourtPlot:
         self.ec = ec
         self.fc = fc
         self.percent = percent
-        self.player_id = self._get_player_id(player_name)
-        self.shots_df = self._fetch_shot_data()
-        self.player_pic = self._fetch_player_pic()
+        self._shot_index = shot_index
+        self._grids = grids
+
+    # Player lookups, shot data and the headshot are only loaded when a plot first needs them,
+    # so constructing a CourtPlot (e.g. just to draw_court) does no I/O
+    @cached_property
+    def player_id(self):
+        return reference().player_id(self.player_name)
+
+    @cached_property
+    def shots_df(self):
+        # Take shots from a pre-fetched league frame (utils.ShotIndex) when given, saving the request
+        if self._shot_index is not None:
+            return self._shot_index.get(self.player_id)
+        return self._fetch_shot_data()
+
+    @cached_property
+    def player_pic(self):
+        return self._fetch_player_pic()
 
-    def _get_player_id(self, player_name):
-        # Fetch player ID based on name
-        player_dict = players.get_active_players()
-        return next((player['id'] for player in player_dict if player['full_name'].lower() == player_name.lower()), None)
+    def __getstate__(self):
+        # Sent to batch render workers fully loaded, and without the whole league's shots
+        self.shots_df, self.player_pic
+        state = self.__dict__.copy()
+        state['_shot_index'] = None
+        if self._grids is not None:
+            state['_grids'] = self._grids.for_player(self.player_id)
+        return state
 
     def _fetch_shot_data(self):
         try:
@@ -52,16 +84,46 @@ class CourtPlot:
             return pd.DataFrame()  # Return empty DataFrame on failure
         
     def _fetch_player_pic(self):
-        url_address = f'https://cdn.nba.com/headshots/nba/latest/1040x760/{self.player_id}.png'
-        response = requests.get(url_address) # Send http request to the url address
-      
-        # Make sure everything went right
-        if response.status_code == 200:
-            image_bytes = BytesIO(response.content) # Get content 
-            image = Image.open(image_bytes) # Open the image
-            return image # Output
-        else:
-            print("Failed to download image:", response.status_code)
+        # Thumbnail from the shared headshot store, only hitting cdn.nba.com when it isn't stored or has gone stale
+        return get_store().get(self.player_id)
+
+    def _split_shots(self):
+        # Misses then makes, as (LOC_X, LOC_Y) arrays, from one stable sort on the made flag
+        made = self.shots_df.SHOT_MADE_FLAG.to_numpy()
+        order = np.argsort(made, kind='stable')
+        split = np.searchsorted(made[order], 1)
+        x = self.shots_df.LOC_X.to_numpy()[order]
+        y = self.shots_df.LOC_Y.to_numpy()[order]
+        return (x[:split], y[:split]), (x[split:], y[split:])
+
+    def _draw_shots(self, ax, mode='scatter'):
+        # Every shot as a made/missed point, or (heatmap) one collection of grid cells for the lot
+        if mode == 'heatmap':
+            return [self._draw_heatmap(ax)]
+        if mode != 'scatter':
+            raise ValueError(f"Unknown shot chart mode {mode!r}, expected 'scatter' or 'heatmap'")
+
+        artists = []
+        for (x, y), edge_col in zip(self._split_shots(), ['red', 'green']):
+            marker_style = dict(fc=edge_col, ec=edge_col, s=150, alpha=0.4)
+            artists.append(ax.scatter(x, y, **marker_style))
+        return artists
+
+    def _draw_heatmap(self, ax, max_diff=0.15):
+        # Cells coloured by FG% against the league's in the same spot, sized by the player's volume there
+        if self._grids is None:
+            raise ValueError("Heatmap mode needs league shot grids, e.g. CourtPlot(..., grids=utils.ShotGrid.league_grids(shots))")
+        fga, fgm = self._grids.player(self.player_id)
+        cells = np.flatnonzero(fga)
+        diff = self._grids.relative(fga, fgm)[cells]
+
+        # Scaled against a busy cell rather than the busiest, so the rim doesn't shrink everything else
+        volume = fga[cells] / max(np.percentile(fga[cells], 90), 1) if len(cells) else fga[cells]
+        scale = np.clip(np.sqrt(volume), 0.3, 1.0)
+        collection = PolyCollection(self._grids.grid.polygons(cells, scale), array=diff, cmap='RdYlGn',
+                                    norm=Normalize(-max_diff, max_diff), edgecolors='none')
+        ax.add_collection(collection)
+        return collection
 
     def draw_court(self, ax=None, halfcourt=True, moreyball=False):
         # Draw the court elements on a matplotlib axis
@@ -101,18 +163,68 @@ class CourtPlot:
             ax.add_patch(element)
         return ax
 
-    def plot_shots(self, title_text="", subtitle_text="", show_picture=True, save_plot=False, save_plot_name="plot.png"):
-        # Main plotting function for shots on the court
+    def _court_template(self, figsize=(12, 12), dpi=100):
+        # One drawn court per colour scheme: the figure, its axes and a snapshot of the rendered pixels
+        key = (self.bg, self.ac, self.ec, self.fc, figsize, dpi)
+        if key not in _court_templates:
+            fig = Figure(figsize=figsize, dpi=dpi)
+            canvas = FigureCanvasAgg(fig)
+            ax = fig.add_subplot()
+            self.draw_court(ax=ax, moreyball=True)
+            ax.set_xlim(300, -300)
+            ax.set_ylim(-100, 500)
+            fig.patch.set_facecolor(self.bg)
+            ax.axis('off')
+            canvas.draw()
+            _court_templates[key] = (fig, ax, canvas.copy_from_bbox(fig.bbox))
+        return _court_templates[key]
+
+    def render_shots(self, save_plot_name, title_text="", subtitle_text="", show_picture=True, mode='scatter'):
+        """
+        Batch version of plot_shots: restores the cached court pixels and draws only this player's shots,
+        titles and headshot on top, then saves the court area as a png. Same layout as plot_shots(save_plot=True).
+        """
+        fig, ax, background = self._court_template()
+        fig.canvas.restore_region(background)
+
+        if not title_text:
+            title_text = f"Shooting Chart — {self.player_name}"
+        if not subtitle_text:
+            subtitle_text =  f"{self.season} season"
+
+        artists = self._draw_shots(ax, mode)
+        artists.append(ax.text(250, 460, title_text, size='22', weight='semibold', family=custom_font()))
+        artists.append(ax.text(250, 440, subtitle_text, size='16', family=custom_font()))
+
+        if show_picture:
+            ax_image = fig.add_axes([0.72, 0.7659, 0.12, 0.12])
+            ax_image.imshow(self.player_pic)
+            ax_image.axis('off')
+            artists.append(ax_image)
+
+        for artist in artists:
+            fig.draw_artist(artist)
+
+        # Everything sits inside the court axes, which is what bbox_inches="tight" would crop to
+        x0, y0, x1, y1 = np.round(ax.get_window_extent().extents).astype(int)
+        pixels = np.asarray(fig.canvas.buffer_rgba())
+        Image.fromarray(pixels[pixels.shape[0] - y1:pixels.shape[0] - y0, x0:x1]).save(save_plot_name)
+
+        for artist in artists:
+            artist.remove()
+        return save_plot_name
+
+    def plot_shots(self, title_text="", subtitle_text="", show_picture=True, save_plot=False, save_plot_name="plot.png", mode='scatter'):
+        # Main plotting function for shots on the court. mode='heatmap' draws the grid cells of
+        # the shot grids passed to the constructor instead of individual shots.
         fig, ax = plt.subplots(figsize=(12, 12))
         self.draw_court(ax=ax, moreyball=True)
         
         # Set font
-        plt.rcParams['font.family'] = custom_font
+        plt.rcParams['font.family'] = custom_font()
 
-        # Plot shots based on make or miss
-        for i, edge_col in enumerate(['red', 'green']):
-            marker_style = dict(fc=edge_col, ec=edge_col, s=150, alpha=0.4)
-            ax.scatter(self.shots_df[self.shots_df.SHOT_MADE_FLAG == i].LOC_X, self.shots_df[self.shots_df.SHOT_MADE_FLAG == i].LOC_Y, **marker_style)
+        # Plot shots based on make or miss, or their efficiency by grid cell
+        self._draw_shots(ax, mode)
         
         # Set limits and hide axis lines
         ax.set_xlim(300, -300)
@@ -135,4 +247,24 @@ class CourtPlot:
             ax_image.axis('off')
 
         if save_plot:
-            plt.savefig(save_plot_name, bbox_inches="tight", pad_inches=0)
\ No newline at end of file
+            plt.savefig(save_plot_name, bbox_inches="tight", pad_inches=0)
+
+
+def _init_render_worker():
+    # Workers never show anything, so skip GUI backends entirely
+    matplotlib.use('Agg')
+
+
+def _render(job):
+    plot, kwargs = job
+    return plot.render_shots(**kwargs)
+
+
+def plot_batch(jobs, processes=None):
+    """
+    Render many shot charts across a process pool, reusing each worker's cached court background.
+    `jobs` is a list of (CourtPlot, render_shots keyword arguments) pairs, each with its own `save_plot_name`.
+    Returns the saved file names in job order.
+    """
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_render_worker) as pool:
+        return list(pool.map(_render, jobs, chunksize=max(1, len(jobs) // (4 * (processes or 4)))))
@@ -0,0 +1,13 @@
+# Output key -> source column of distance.yml, written by both leagueleaders.py and distance.py
+DISTANCE_FIELDS = {
+  'id': 'PLAYER_ID',
+  'name': 'PLAYER_NAME',
+  'team': 'TEAM_ABBREVIATION',
+  'games': 'GP',
+  'minutes': 'MIN',
+  'miles': 'DIST_MILES',
+  'avg_speed': 'AVG_SPEED',
+  'marathons': 'DIST_MARATHONS',
+  'miles_per_game': 'MILES_PER_GAME',
+  'miles_per_thirty': 'MILES_PER_36',
+}
@@ -0,0 +1,172 @@
+import numpy as np
+import pandas as pd
+
+from utils.Possessions import _parse_unique, clock_seconds
+
+DESCRIPTIONS = ['HOMEDESCRIPTION', 'VISITORDESCRIPTION', 'NEUTRALDESCRIPTION']
+
+# Flag column: (EVENTMSGTYPE, EVENTMSGACTIONTYPEs) it covers, or a case-insensitive pattern in the description
+EVENT_FLAGS = {
+  'IS_CHALLENGE_TIMEOUT': (9, [7]),
+  'IS_REVIEW': (18, [4, 5]),
+  'MENTIONS_CHALLENGE': r'challenge',
+  'MENTIONS_REVIEW': r'official review',
+}
+# Events a coach's challenge can show up as in the play-by-play
+CHALLENGE_FLAGS = list(EVENT_FLAGS)
+
+CHALLENGE_CLOCK = 'Game Clock - Review is Triggered'
+
+
+def flag_events(pbp):
+  """The EVENT_FLAGS as boolean columns, with every description scanned once."""
+  flags = pd.DataFrame(index=pbp.index)
+  event = pbp['EVENTMSGTYPE'].to_numpy()
+  action = pbp['EVENTMSGACTIONTYPE'].to_numpy()
+
+  text = pd.Series('', index=pbp.index)
+  for column in DESCRIPTIONS:
+    if column in pbp:
+      text = text + pbp[column].fillna('')
+  patterns = {name: p for name, p in EVENT_FLAGS.items() if isinstance(p, str)}
+  found = text.str.extract('|'.join(f'(?P<{name}>{p})' for name, p in patterns.items()), flags=2)
+
+  for name, rule in EVENT_FLAGS.items():
+    if isinstance(rule, str):
+      flags[name] = found[name].notna().to_numpy()
+    else:
+      flags[name] = (event == rule[0]) & np.isin(action, rule[1])
+  return flags
+
+
+class EventIndex:
+  """
+  A season of play-by-play sorted once by game, period and clock, with the row range of every
+  (game, period) and precomputed event flags. Matching outside events to plays is then a sorted
+  search within one period, rather than a scan of the season.
+  """
+
+  def __init__(self, pbp):
+    df = pbp.copy()
+    if 'PCTIME_SECONDS' not in df:
+      df['PCTIME_SECONDS'] = clock_seconds(df['PCTIMESTRING'])
+    df['PCTIME_SECONDS'] = df['PCTIME_SECONDS'].astype(np.float64)
+    df = df.join(flag_events(df))
+    self.events = df.sort_values(['GAME_ID', 'PERIOD', 'PCTIME_SECONDS', 'EVENTNUM'], kind='stable').reset_index(drop=True)
+
+    keys = self.events[['GAME_ID', 'PERIOD']]
+    starts = np.flatnonzero(keys.ne(keys.shift()).any(axis=1).to_numpy())
+    ends = np.append(starts[1:], len(keys))
+    self._periods = {(g, p): (s, e) for g, p, s, e in zip(keys['GAME_ID'].to_numpy()[starts].tolist(),
+                                                          keys['PERIOD'].to_numpy()[starts].tolist(),
+                                                          starts.tolist(), ends.tolist())}
+    self._clock = self.events['PCTIME_SECONDS'].to_numpy()
+    self._flags = self.events[list(EVENT_FLAGS)].to_numpy()
+
+    # Each team plays at most once a day, so (date, either team) identifies a game. Pairs naming
+    # more than one game (bad dates, a suspended game replayed) identify none, and are kept apart
+    games = self.events.drop_duplicates('GAME_ID')[['GAME_ID', 'GAME_DATE', 'HOME_TEAM', 'AWAY_TEAM']]
+    teams = pd.concat([games.rename(columns={'HOME_TEAM': 'TEAM'}).drop(columns='AWAY_TEAM'),
+                       games.rename(columns={'AWAY_TEAM': 'TEAM'}).drop(columns='HOME_TEAM')], ignore_index=True)
+    repeated = teams.duplicated(['GAME_DATE', 'TEAM'], keep=False)
+    self.games = teams[~repeated].reset_index(drop=True)
+    self.ambiguous = teams.loc[repeated, ['GAME_DATE', 'TEAM']].drop_duplicates().reset_index(drop=True)
+
+  def period(self, game_id, period):
+    """Every event of one period, in clock order (empty if the period isn't indexed)."""
+    start, end = self._periods.get((game_id, period), (0, 0))
+    return self.events.iloc[start:end]
+
+  def nearest(self, game_id, period, seconds, tolerance=2.0, flags=None):
+    """
+    The event closest to `seconds` left in the period, optionally only among events with any of
+    `flags` set, or None if nothing is within `tolerance` seconds.
+    """
+    start, end = self._periods.get((game_id, period), (0, 0))
+    rows = np.arange(start, end)
+    if flags:
+      columns = [list(EVENT_FLAGS).index(f) for f in flags]
+      rows = rows[self._flags[start:end, columns].any(axis=1)]
+    if not len(rows):
+      return None
+
+    clock = self._clock[rows]
+    i = np.searchsorted(clock, seconds)
+    candidates = [j for j in (i - 1, i) if 0 <= j < len(rows)]
+    best = min(candidates, key=lambda j: abs(clock[j] - seconds))
+    return self.events.iloc[rows[best]] if abs(clock[best] - seconds) <= tolerance else None
+
+  def resolve_games(self, events, teams=('HOME_TEAM', 'AWAY_TEAM')):
+    """
+    GAME_IDs for events that only have a GAME_DATE and team abbreviations, trying each team column in turn.
+    Events whose date and teams name no game, or only ones with more than one game that day, are left missing.
+    """
+    game_ids = pd.Series(None, index=events.index, dtype=object)
+    for team in teams:
+      found = events[['GAME_DATE', team]].merge(self.games.rename(columns={'TEAM': team}), how='left',
+                                                on=['GAME_DATE', team], validate='many_to_one')
+      game_ids = game_ids.fillna(pd.Series(found['GAME_ID'].to_numpy(), index=events.index))
+
+    if len(self.ambiguous):
+      ambiguous = pd.Series(False, index=events.index)
+      for team in teams:
+        keys = pd.MultiIndex.from_frame(events[['GAME_DATE', team]])
+        ambiguous |= keys.isin(pd.MultiIndex.from_frame(self.ambiguous)) & game_ids.isna()
+      if ambiguous.any():
+        print(f"{ambiguous.sum()} events left unresolved: their date and team name more than one game")
+    return game_ids
+
+  def match(self, events, tolerance=2.0, flags=CHALLENGE_FLAGS):
+    """
+    Match outside events (with GAME_ID, PERIOD and PCTIME_SECONDS) to the nearest play-by-play event
+    in the same period with any of `flags` set, within `tolerance` seconds, in one merge_asof pass.
+    Returns the matched events joined to their plays, and the unmatched events with a REASON.
+    """
+    events = events.copy()
+    events['PCTIME_SECONDS'] = events['PCTIME_SECONDS'].astype(np.float64)
+    events['_ROW'] = np.arange(len(events))
+
+    plays = self.events[self.events[flags].any(axis=1)] if flags else self.events
+    plays = plays.assign(PBP_SECONDS=plays['PCTIME_SECONDS'])
+    plays = plays.drop(columns=[c for c in events.columns if c in plays and c not in ('GAME_ID', 'PERIOD')])
+
+    known = events[events['GAME_ID'].notna()].astype({'GAME_ID': plays['GAME_ID'].dtype})
+    merged = pd.merge_asof(known.sort_values('PCTIME_SECONDS'), plays.sort_values('PBP_SECONDS'),
+                           left_on='PCTIME_SECONDS', right_on='PBP_SECONDS', by=['GAME_ID', 'PERIOD'],
+                           direction='nearest', tolerance=tolerance)
+    found = merged['PBP_SECONDS'].notna().to_numpy()
+    matched = merged[found].sort_values('_ROW').drop(columns='_ROW').reset_index(drop=True)
+
+    unmatched = events[~events['_ROW'].isin(merged.loc[found, '_ROW'])].copy()
+    indexed = pd.Series([k in self._periods for k in zip(unmatched['GAME_ID'], unmatched['PERIOD'])], index=unmatched.index, dtype=bool)
+    unmatched['REASON'] = np.select([unmatched['GAME_ID'].isna().to_numpy(), ~indexed.to_numpy()],
+                                    ['no game found', 'period not in play-by-play'],
+                                    f'no flagged event within {tolerance}s')
+    unmatched = unmatched.drop(columns='_ROW').reset_index(drop=True)
+
+    print(f"Matched {len(matched)} of {len(events)} events, {len(unmatched)} unmatched")
+    for reason, count in unmatched['REASON'].value_counts().items():
+      print(f"  {count} {reason}")
+    return matched, unmatched
+
+
+def read_challenges(path):
+  """
+  Load the league's coach's challenge log, with the GAME_DATE, HOME_TEAM, AWAY_TEAM, PERIOD
+  and PCTIME_SECONDS columns used to match it to play-by-play.
+  """
+  challenges = pd.read_csv(path)
+  challenges['GAME_DATE'] = pd.to_datetime(challenges['Date'], format='%m/%d/%Y').dt.strftime('%Y-%m-%d')
+  challenges['HOME_TEAM'] = challenges['Home Team']
+  challenges['AWAY_TEAM'] = challenges['Away Team']
+  challenges['PERIOD'] = challenges['Period']
+  challenges['PCTIME_SECONDS'] = _parse_unique(challenges[CHALLENGE_CLOCK], lambda c: int(c.split(':')[0]) * 60 + float(c.split(':')[1]))
+  return challenges
+
+
+def match_challenges(pbp, path, tolerance=2.0):
+  """Match every challenge in the log at `path` to its review in the play-by-play; returns (matched, unmatched)."""
+  index = pbp if isinstance(pbp, EventIndex) else EventIndex(pbp)
+  challenges = read_challenges(path)
+  challenges['GAME_ID'] = index.resolve_games(challenges)
+  return index.match(challenges, tolerance=tolerance)
@@ -0,0 +1,179 @@
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import Callable, Optional, Tuple
+
+STATS_HOST = 'stats.nba.com'
+CDN_HOST = 'cdn.nba.com'
+
+# Requests per second and burst size for each host. stats.nba.com starts dropping
+# connections when hit too hard, so keep it conservative.
+DEFAULT_RATES = {
+  STATS_HOST: (1.0, 3),
+  CDN_HOST: (10.0, 10),
+}
+
+
+class TokenBucket:
+  """Thread-safe token bucket allowing `rate` acquisitions per second, bursting up to `capacity`."""
+
+  def __init__(self, rate, capacity=1):
+    self.rate = rate
+    self.capacity = capacity
+    self._tokens = capacity
+    self._updated = time.monotonic()
+    self._lock = threading.Lock()
+
+  def acquire(self):
+    # Waiters queue on the lock, so tokens are handed out roughly in arrival order
+    with self._lock:
+      while True:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+          self._tokens -= 1
+          return
+        time.sleep((1 - self._tokens) / self.rate)
+
+
+class TaskSkipped(Exception):
+  """Raised for a task that never ran because one of its dependencies failed."""
+
+
+class SchedulerError(Exception):
+  """Raised at the end of a run when a required task failed."""
+
+
+@dataclass
+class Task:
+  name: str
+  fn: Callable
+  deps: Tuple[str, ...] = ()
+  host: Optional[str] = None
+  deadline: Optional[float] = None
+  optional: bool = False
+  started: Optional[float] = field(default=None, repr=False)
+
+
+class FetchScheduler:
+  """
+  Run a graph of fetch and processing tasks on a bounded thread pool.
+  A task starts as soon as all of its dependencies have finished and is called with their results,
+  in the order the dependencies were listed. Tasks tagged with a host in `rates` take one of its
+  tokens to start (hosts whose requests are limited one by one, like stats.nba.com through
+  StatsHTTP, are left out of `rates`), and a task still running after its deadline (seconds, counted from when it actually started)
+  is failed so the run, and anything not depending on it, can finish.
+  """
+
+  def __init__(self, max_workers=4, rates=None, default_deadline=None, profile=None):
+    self.max_workers = max_workers
+    # Optional utils.Profile.RunProfile, given every task's run time and time spent waiting on a rate limit
+    self.profile = profile
+    self.default_deadline = default_deadline
+    rates = DEFAULT_RATES if rates is None else rates
+    self.buckets = {host: TokenBucket(rate, capacity) for host, (rate, capacity) in rates.items()}
+    self.tasks = {}
+    self.errors = {}
+
+  def add(self, name, fn, deps=(), host=None, deadline=None, optional=False):
+    """Register a task. Optional tasks may fail without failing the run."""
+    if name in self.tasks:
+      raise ValueError(f"Task {name} is already scheduled")
+    self.tasks[name] = Task(name, fn, tuple(deps), host,
+                            deadline if deadline is not None else self.default_deadline, optional)
+    return name
+
+  def _call(self, task, args):
+    queued = time.monotonic()
+    if task.host in self.buckets:
+      self.buckets[task.host].acquire()
+    task.started = time.monotonic()
+    error = None
+    try:
+      return task.fn(*args)
+    except Exception as e:
+      error = e
+      raise
+    finally:
+      if self.profile is not None:
+        self.profile.add_stage(task.name, time.monotonic() - task.started, wait=task.started - queued, error=error)
+
+  def needed(self, names):
+    """The tasks in `names` and everything they depend on, directly or not."""
+    needed, stack = set(), list(names)
+    while stack:
+      name = stack.pop()
+      if name not in needed:
+        needed.add(name)
+        stack.extend(self.tasks[name].deps)
+    return needed
+
+  def run(self, only=None):
+    """
+    Run every task, or with `only` just those tasks and what they depend on,
+    and return a dict of results keyed by task name.
+    """
+    unknown = {dep for task in self.tasks.values() for dep in task.deps if dep not in self.tasks}
+    unknown |= set(only or ()) - set(self.tasks)
+    if unknown:
+      raise ValueError(f"Unknown dependencies: {sorted(unknown)}")
+
+    results, errors = {}, {}
+    pending = dict(self.tasks) if only is None else {name: self.tasks[name] for name in self.needed(only)}
+    scheduled = len(pending)
+    running = {}
+    start = time.monotonic()
+    pool = ThreadPoolExecutor(max_workers=self.max_workers)
+
+    try:
+      while pending or running:
+        # Start everything whose inputs have arrived, skip anything whose inputs never will
+        for name, task in list(pending.items()):
+          failed = [dep for dep in task.deps if dep in errors]
+          if failed:
+            errors[name] = TaskSkipped(f"dependency {failed[0]} failed")
+            del pending[name]
+          elif all(dep in results for dep in task.deps):
+            running[pool.submit(self._call, task, [results[dep] for dep in task.deps])] = task
+            del pending[name]
+
+        if not running:
+          if pending:
+            raise ValueError(f"Dependency cycle between tasks: {sorted(pending)}")
+          break
+
+        now = time.monotonic()
+        timeouts = [t.started + t.deadline - now for t in running.values() if t.deadline and t.started]
+        if any(t.deadline and not t.started for t in running.values()):
+          # Queued tasks' deadline clocks have not started yet, so check back shortly
+          timeouts.append(1.0)
+        done, _ = wait(running, timeout=max(min(timeouts), 0) if timeouts else None, return_when=FIRST_COMPLETED)
+
+        for future in done:
+          task = running.pop(future)
+          try:
+            results[task.name] = future.result()
+            print(f"{task.name} finished in {time.monotonic() - task.started:.1f}s")
+          except Exception as e:
+            errors[task.name] = e
+            print(f"{task.name} failed: {e}")
+
+        # Give up on anything past its deadline; the worker thread is left to finish on its own
+        now = time.monotonic()
+        for future, task in list(running.items()):
+          if task.deadline and task.started and now - task.started > task.deadline:
+            running.pop(future)
+            errors[task.name] = TimeoutError(f"{task.name} exceeded its {task.deadline}s deadline")
+            print(f"{task.name} failed: exceeded its {task.deadline}s deadline")
+    finally:
+      pool.shutdown(wait=False, cancel_futures=True)
+
+    print(f"Ran {scheduled} tasks in {time.monotonic() - start:.1f}s")
+    self.errors = errors
+    required = {name: e for name, e in errors.items() if not self.tasks[name].optional}
+    if required:
+      raise SchedulerError("; ".join(f"{name}: {e}" for name, e in required.items()))
+    return results
@@ -0,0 +1,23 @@
+import os
+import threading
+
+from contextlib import contextmanager
+from pathlib import Path
+
+
+@contextmanager
+def atomic_write(path):
+  """
+  Yield a temporary path beside `path` to write to, then swap it in for `path` when the block exits.
+  Readers never see a half written file and an interrupted write leaves the old one in place; if
+  the block raises, the temporary file is removed. Temporary names are per process and thread, so
+  concurrent writers of the same file don't clobber each other's.
+  """
+  path = Path(path)
+  path.parent.mkdir(parents=True, exist_ok=True)
+  tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+  try:
+    yield tmp
+    os.replace(tmp, path)
+  finally:
+    tmp.unlink(missing_ok=True)
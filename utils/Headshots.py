@@ -0,0 +1,143 @@
+import json
+import threading
+import time
+
+import requests
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from PIL import Image
+from requests.adapters import HTTPAdapter
+
+from utils.Files import atomic_write
+
+HEADSHOT_URL = 'https://cdn.nba.com/headshots/nba/latest/1040x760/{player_id}.png'
+CACHE_DIR = Path(__file__).parent.parent / ".cache" / "headshots"
+
+# plot_shots draws the headshot in a 0.12 x 0.12 inset of a 12in, 100dpi figure: 144px across
+THUMBNAIL_BOX = (144, 144)
+
+
+class HeadshotStore:
+  """
+  Player headshots from cdn.nba.com, kept on disk as thumbnails sized for the shot chart inset.
+  A stored headshot is reused without any request for `max_age` seconds, then revalidated with
+  ETag/If-Modified-Since. The least recently used thumbnails are evicted past `max_bytes` on disk,
+  and past `max_images` in memory.
+  """
+
+  def __init__(self, path=CACHE_DIR, size=THUMBNAIL_BOX, max_age=7 * 24 * 60 * 60, max_bytes=64 * 1024 * 1024, pool_size=16,
+               max_images=256):
+    self.path = Path(path)
+    self.size = size
+    self.max_age = max_age
+    self.max_bytes = max_bytes
+    self.pool_size = pool_size
+    self.max_images = max_images
+
+    # One pooled session for every download, sized for prefetch's concurrency
+    self.session = requests.Session()
+    self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+
+    # Loaded thumbnails, least recently used first
+    self._images = OrderedDict()
+    self._lock = threading.Lock()
+
+  def _files(self, player_id):
+    return self.path / f"{player_id}.png", self.path / f"{player_id}.json"
+
+  def get(self, player_id):
+    """The headshot thumbnail for `player_id`, or None if there isn't one."""
+    with self._lock:
+      if player_id in self._images:
+        self._images.move_to_end(player_id)
+        return self._images[player_id]
+
+    image_file, meta_file = self._files(player_id)
+    try:
+      meta = json.loads(meta_file.read_text())
+    except (OSError, ValueError):
+      meta = {}
+
+    if meta and image_file.exists() and time.time() - meta['checked_at'] < self.max_age:
+      image = self._load(image_file)
+    else:
+      image = self._download(player_id, meta)
+
+    if image is not None:
+      with self._lock:
+        self._images[player_id] = image
+        self._images.move_to_end(player_id)
+        while len(self._images) > self.max_images:
+          self._images.popitem(last=False)
+    return image
+
+  def _load(self, image_file):
+    image = Image.open(image_file)
+    image.load()
+    image_file.touch()
+    return image
+
+  def _download(self, player_id, meta):
+    image_file, meta_file = self._files(player_id)
+    headers = {}
+    if meta.get('etag'):
+      headers['If-None-Match'] = meta['etag']
+    if meta.get('last_modified'):
+      headers['If-Modified-Since'] = meta['last_modified']
+
+    try:
+      response = self.session.get(HEADSHOT_URL.format(player_id=player_id), headers=headers, timeout=(5, 20))
+    except requests.RequestException as e:
+      print(f"Failed to download image: {e}")
+      return self._load(image_file) if image_file.exists() else None
+
+    if response.status_code == 304 and image_file.exists():
+      image = self._load(image_file)
+    elif response.status_code == 200:
+      image = Image.open(BytesIO(response.content))
+      image.thumbnail(self.size, Image.LANCZOS)
+      self.path.mkdir(parents=True, exist_ok=True)
+      with atomic_write(image_file) as tmp:
+        image.save(tmp, format='PNG')
+      self.evict()
+    else:
+      print("Failed to download image:", response.status_code)
+      return self._load(image_file) if image_file.exists() else None
+
+    meta_file.write_text(json.dumps({
+      'etag': response.headers.get('ETag', meta.get('etag')),
+      'last_modified': response.headers.get('Last-Modified', meta.get('last_modified')),
+      'checked_at': time.time(),
+    }))
+    return image
+
+  def prefetch(self, player_ids, workers=None):
+    """Fetch many headshots concurrently ahead of a render job; returns {player_id: image}."""
+    player_ids = list(dict.fromkeys(player_ids))
+    with ThreadPoolExecutor(max_workers=workers or self.pool_size) as pool:
+      return dict(zip(player_ids, pool.map(self.get, player_ids)))
+
+  def evict(self):
+    """Delete least recently used thumbnails until the store is under `max_bytes`."""
+    with self._lock:
+      entries = sorted((f.stat().st_mtime, f.stat().st_size, f) for f in self.path.glob('*.png'))
+      total = sum(size for _, size, _ in entries)
+      for _, size, image_file in entries:
+        if total <= self.max_bytes:
+          break
+        image_file.unlink(missing_ok=True)
+        image_file.with_suffix('.json').unlink(missing_ok=True)
+        total -= size
+
+
+_store = None
+
+def get_store():
+  """The process-wide headshot store."""
+  global _store
+  if _store is None:
+    _store = HeadshotStore()
+  return _store
@@ -0,0 +1,188 @@
+import os
+
+import pandas as pd
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from io import BytesIO
+from pathlib import Path
+
+from utils.FetchScheduler import DEFAULT_RATES, STATS_HOST, TokenBucket
+from utils.Files import atomic_write
+
+HISTORY_DIR = Path(__file__).parent.parent / "data" / "history"
+
+# Columns identifying a player on each kind of board (Totals tables name them PLAYER)
+PLAYER_NAME_COLUMNS = ['PLAYER_NAME', 'PLAYER']
+
+
+def current_season():
+  """
+  The season being tracked, e.g. '2025-26'. Taken from NBA_SEASON_END (YYYY-MM-DD) when set,
+  so post-season runs still target the season that just finished.
+  """
+  season_end = os.environ.get('NBA_SEASON_END')
+  if season_end:
+    # The end date falls in the latter year of the season label (e.g. 2026 → 2025-26)
+    year = int(season_end[:4])
+    return f"{year - 1}-{str(year)[2:]}"
+  from nba_api.stats.library.parameters import Season
+  return Season.current_season
+
+
+def season_range(first, last):
+  """Every season label from `first` to `last` inclusive, e.g. ('2022-23', '2024-25')."""
+  start, end = int(first[:4]), int(last[:4])
+  return [f"{year}-{str(year + 1)[2:]}" for year in range(start, end + 1)]
+
+
+def snapshot_date(season, today=None):
+  """
+  The date a season's numbers fetched today are as of: today while the season is running,
+  and June 30 of its last year once it's over, so a finished season keeps one final snapshot.
+  """
+  today = today or date.today()
+  return min(date(int(season[:4]) + 1, 6, 30), today).isoformat()
+
+
+class HistoryStore:
+  """
+  Snapshots of every board (leaders, moreyball, distance, shot_distance) over seasons, as Parquet
+  partitioned by season and the date the numbers are as of:
+  data/history/<board>/SEASON=<season>/SNAPSHOT=<YYYY-MM-DD>/part.parquet
+  Answers "by season" and "as of" questions from disk instead of from git history or new requests.
+  """
+
+  def __init__(self, path=HISTORY_DIR):
+    self.root = Path(path)
+
+  def _partition(self, board, season, snapshot):
+    return self.root / board / f"SEASON={season}" / f"SNAPSHOT={snapshot}" / "part.parquet"
+
+  def has(self, board, season, snapshot):
+    return self._partition(board, season, snapshot).exists()
+
+  def snapshots(self, board, seasons=None, as_of=None):
+    """Sorted (season, snapshot) pairs stored for `board`, optionally only `seasons` and dates up to `as_of`."""
+    found = []
+    for p in (self.root / board).glob('SEASON=*/SNAPSHOT=*/part.parquet'):
+      season = p.parent.parent.name.split('=', 1)[1]
+      snapshot = p.parent.name.split('=', 1)[1]
+      if (seasons is None or season in seasons) and (as_of is None or snapshot <= str(as_of)):
+        found.append((season, snapshot))
+    return sorted(found)
+
+  def write(self, board, season, snapshot, df):
+    """
+    Store `df` as the `board` snapshot for `season` as of `snapshot` (YYYY-MM-DD), replacing any already there.
+    A frame identical to the season's previous snapshot isn't stored again, since "as of" reads already find
+    that one; returns the rows written (0 then).
+    """
+    path = self._partition(board, season, snapshot)
+    # Compared as read back from Parquet, like the earlier snapshot it's checked against
+    data = df.to_parquet(index=False)
+
+    earlier = [s for _, s in self.snapshots(board, [season]) if s < snapshot]
+    if earlier and pd.read_parquet(BytesIO(data)).equals(pd.read_parquet(self._partition(board, season, earlier[-1]))):
+      # Including any snapshot an earlier run stored today, which these numbers replace
+      path.unlink(missing_ok=True)
+      if path.parent.exists() and not any(path.parent.iterdir()):
+        path.parent.rmdir()
+      return 0
+    with atomic_write(path) as tmp:
+      tmp.write_bytes(data)
+    return len(df)
+
+  def read(self, board, seasons=None, as_of=None, every=False, columns=None, filters=None):
+    """
+    `board` for `seasons` (default every stored season) as one frame with SEASON and SNAPSHOT columns:
+    each season's latest snapshot on or before `as_of` (default the latest), or with `every`, all of them.
+    `columns` and `filters` (pyarrow filters) are applied while reading, so only what's asked for is loaded.
+    """
+    pairs = self.snapshots(board, seasons, as_of)
+    if not every:
+      # Pairs are sorted, so the last snapshot seen for a season is its latest
+      pairs = list(dict(pairs).items())
+
+    frames = []
+    for season, snapshot in pairs:
+      df = pd.read_parquet(self._partition(board, season, snapshot), columns=columns, filters=filters)
+      df.insert(0, 'SNAPSHOT', snapshot)
+      df.insert(0, 'SEASON', season)
+      frames.append(df)
+    if not frames:
+      return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+  def player(self, board, player, columns=None, as_of=None, every=False):
+    """
+    One player's rows of `board` by season, e.g. player('moreyball', 'Stephen Curry', ['Pct Moreyball_FGA']).
+    `player` is a PLAYER_ID, or a name matched case-insensitively.
+    """
+    if isinstance(player, str):
+      df = self.read(board, as_of=as_of, every=every)
+      if df.empty:
+        return df
+      name = next(c for c in PLAYER_NAME_COLUMNS if c in df)
+      df = df[df[name].str.casefold() == player.casefold()]
+    else:
+      wanted = None if columns is None else ['PLAYER_ID', *columns]
+      df = self.read(board, as_of=as_of, every=every, columns=wanted, filters=[('PLAYER_ID', '==', int(player))])
+    if columns is not None and not df.empty:
+      df = df[['SEASON', 'SNAPSHOT', 'PLAYER_ID', *[c for c in columns if c != 'PLAYER_ID']]]
+    return df.reset_index(drop=True)
+
+  def leaders(self, board, column, season=None, as_of=None, n=10, ascending=False):
+    """
+    Top `n` rows of `board` by `column` for `season` (default the current one) as the numbers stood on `as_of`.
+    For per game or per 36 rankings of the leaders board, pass its frame to utils.Leaderboard.
+    """
+    df = self.read(board, [season or current_season()], as_of=as_of)
+    if df.empty:
+      return df
+    top = df.nsmallest(n, column) if ascending else df.nlargest(n, column)
+    return top.reset_index(drop=True)
+
+
+def _init_worker(rate, capacity, offline):
+  # Each process gets the response cache and its share of the stats.nba.com rate limit, which every
+  # request the worker makes (a board may take several, and retries) draws from
+  from utils import StatsHTTP
+
+  StatsHTTP.install(offline=offline, bucket=TokenBucket(rate, capacity))
+
+
+def _backfill_one(fetch, board, season, snapshot, path):
+  return HistoryStore(path).write(board, season, snapshot, fetch(season))
+
+
+def backfill(boards, seasons, processes=2, store=None, offline=False):
+  """
+  Fetch every board for every season into the history store, `processes` (season, board) pairs at a time.
+  `boards` maps a board name to a picklable fn(season) returning its frame. Pairs already stored for
+  their snapshot date (see snapshot_date) are skipped, so rerunning after a failure picks up where it
+  stopped. Returns {(board, season): error} for pairs that failed; they're fetched again next run.
+  """
+  store = store or HistoryStore()
+  jobs = [(board, season, snapshot_date(season)) for season in seasons for board in boards]
+  missing = [job for job in jobs if not store.has(*job)]
+  print(f"{len(jobs) - len(missing)} of {len(jobs)} season boards already stored in {store.root}")
+
+  # The processes share the host's rate between them, bursts included
+  rate, capacity = DEFAULT_RATES[STATS_HOST]
+  errors = {}
+  with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                           initargs=(rate / processes, max(1, capacity // processes), offline)) as pool:
+    futures = {pool.submit(_backfill_one, boards[board], board, season, snapshot, store.root): (board, season)
+               for board, season, snapshot in missing}
+    for future in as_completed(futures):
+      board, season = futures[future]
+      try:
+        print(f"{board} {season}: {future.result()} rows stored")
+      except Exception as err:
+        print(f"{board} {season} failed: {err}")
+        errors[(board, season)] = err
+
+  if errors:
+    print(f"{len(errors)} season boards failed and will be retried on the next run: {sorted(errors)}")
+  return errors
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+
+from nba_api.stats.endpoints import leaguedashteamstats, leagueleaders
+from nba_api.stats.library.parameters import Season
+
+# Totals-only columns that the PerGame leaders table leaves out
+TOTALS_ONLY = ['PF', 'AST_TOV', 'STL_TOV']
+# Columns that are never divided when converting totals to rates
+IDENTITY = ['PLAYER_ID', 'RANK', 'PLAYER', 'TEAM_ID', 'TEAM', 'GP', 'FG_PCT', 'FG3_PCT', 'FT_PCT']
+
+# Share of team games a player must appear in to qualify for a per game leaderboard
+MIN_GAMES_PCT = 0.7
+
+
+def get_totals(season=Season.default, category='PTS'):
+  """Fetch the full season Totals table, which every other leaderboard is derived from."""
+
+  return leagueleaders.LeagueLeaders(league_id='00',
+                                     per_mode48='Totals',
+                                     scope='S',
+                                     season=season,
+                                     season_type_all_star='Regular Season',
+                                     stat_category_abbreviation=category
+  ).league_leaders.get_data_frame()
+
+
+def get_team_games(season=Season.default):
+  """Games played so far by every team, as a Series indexed by TEAM_ID, from the team dashboard."""
+
+  teams = leaguedashteamstats.LeagueDashTeamStats(league_id_nullable='00',
+                                                  per_mode_detailed='Totals',
+                                                  season=season,
+                                                  season_type_all_star='Regular Season'
+  ).league_dash_team_stats.get_data_frame()
+  return teams.set_index('TEAM_ID')['GP']
+
+
+def _round(values, decimals=1):
+  # stats.nba.com rounds halves up, where numpy rounds them to even
+  scale = 10 ** decimals
+  return np.floor(values * scale + 0.5) / scale
+
+
+class Leaderboard:
+  """
+  Rankings for any stat category and per mode (Totals, PerGame, Per36, Per48) from one Totals table.
+  Rates are computed for every column at once, and rankings use np.argpartition, so extra
+  categories cost neither requests nor a full sort.
+  """
+
+  def __init__(self, totals, team_games=None, category='PTS', min_games_pct=MIN_GAMES_PCT):
+    self.totals = totals
+    self.category = category
+
+    # A player qualifies for the per game boards by appearing in `min_games_pct` of their current team's
+    # games, from get_team_games(). Without those (e.g. for a stored snapshot), the league's games so far,
+    # the most any player has appeared in, stand in for every team's.
+    elapsed = totals['GP'].max()
+    if team_games is None:
+      games = pd.Series(elapsed, index=totals.index)
+    else:
+      games = totals['TEAM_ID'].map(team_games).fillna(elapsed)
+    self.qualified = (totals['GP'] >= np.ceil(games * min_games_pct)).to_numpy()
+
+  def rates(self, per_mode):
+    """The table converted to `per_mode`, unrounded."""
+    if per_mode == 'Totals':
+      return self.totals
+
+    df = self.totals.drop(columns=TOTALS_ONLY, errors='ignore')
+    stats = [c for c in df.columns if c not in IDENTITY]
+    values = df[stats].to_numpy(dtype=np.float64)
+    gp = df['GP'].to_numpy(dtype=np.float64)[:, None]
+    minutes = df['MIN'].to_numpy(dtype=np.float64)[:, None]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+      if per_mode == 'PerGame':
+        values = values / gp
+      elif per_mode in ('Per36', 'Per48'):
+        values = values / minutes * int(per_mode[3:])
+        # Minutes stay per game, they're the denominator of everything else
+        values[:, stats.index('MIN')] = minutes[:, 0] / gp[:, 0]
+      else:
+        raise ValueError(f"Unknown per mode {per_mode}")
+
+    df = df.copy()
+    df[stats] = values
+    return df
+
+  def top(self, category, per_mode='PerGame', top_n=50):
+    """Top `top_n` players in `category`, ranked and formatted like the LeagueLeaders endpoint."""
+    if per_mode == 'Totals' and category == self.category:
+      # Already ranked by the endpoint
+      return self.totals.head(top_n)
+
+    df = self.rates(per_mode)
+    eligible = np.flatnonzero(self.qualified) if per_mode != 'Totals' else np.arange(len(df))
+    values = df[category].to_numpy(dtype=np.float64)[eligible]
+    values = np.where(np.isnan(values), -np.inf, values)
+
+    # Partition out the top n, then sort just those (ties keep the endpoint's order)
+    n = min(top_n, len(eligible))
+    top = np.argpartition(-values, n - 1)[:n] if 0 < n < len(eligible) else np.arange(n)
+    top = top[np.lexsort((top, -values[top]))]
+
+    out = df.iloc[eligible[top]].copy()
+    out['RANK'] = np.arange(1, n + 1)
+    if per_mode != 'Totals':
+      stats = [c for c in out.columns if c not in IDENTITY]
+      out[stats] = _round(out[stats].to_numpy(dtype=np.float64))
+    return out.reset_index(drop=True)
@@ -0,0 +1,132 @@
+import argparse
+
+import pandas as pd
+
+from datetime import datetime, timedelta
+from pathlib import Path
+from nba_api.stats.endpoints import leaguegamelog, playbyplayv2
+from nba_api.stats.library.parameters import Season
+
+from utils import StatsHTTP
+from utils.FetchScheduler import DEFAULT_RATES, FetchScheduler, TokenBucket, STATS_HOST
+from utils.Files import atomic_write
+from utils.Possessions import tag_possessions
+
+STORE_DIR = Path(__file__).parent.parent / "data" / "pbp"
+
+# Game details from the game log, stored on every play-by-play row
+GAME_FIELDS = ['GAME_ID', 'GAME_DATE', 'AWAY_TEAM', 'HOME_TEAM']
+
+
+class PBPStore:
+  """
+  Local Parquet store of play-by-play for one season, one partition per game:
+  data/pbp/<season>/GAME_ID=<game id>/pbp.parquet
+  A game is written once its events arrive, so a partition existing means the game is done.
+  """
+
+  def __init__(self, season, path=STORE_DIR):
+    self.season = season
+    self.root = Path(path) / season
+
+  def _partition(self, game_id):
+    return self.root / f"GAME_ID={game_id}" / "pbp.parquet"
+
+  def game_ids(self):
+    """Sorted ids of every stored game."""
+    return sorted(p.parent.name.split('=', 1)[1] for p in self.root.glob('GAME_ID=*/pbp.parquet'))
+
+  def __contains__(self, game_id):
+    return self._partition(game_id).exists()
+
+  def read(self, game_ids=None):
+    """Stored play-by-play for `game_ids` (default every stored game) as one frame, in game order."""
+    game_ids = sorted(g for g in game_ids if g in self) if game_ids is not None else self.game_ids()
+    if not game_ids:
+      return pd.DataFrame()
+    return pd.concat([pd.read_parquet(self._partition(g)) for g in game_ids], ignore_index=True)
+
+  def write(self, game_id, pbp):
+    with atomic_write(self._partition(game_id)) as tmp:
+      pbp.to_parquet(tmp, index=False)
+    return len(pbp)
+
+
+def get_games(season=Season.default, last_n_days=None):
+  """
+  One row per game from the league game log (GAME_ID, GAME_DATE, AWAY_TEAM, HOME_TEAM),
+  for the whole season or just games in the last `last_n_days` days.
+  """
+  params = dict(season=season)
+  if last_n_days is not None:
+    params['date_from_nullable'] = (datetime.today() - timedelta(days=last_n_days)).strftime('%m/%d/%Y')
+  game_log = leaguegamelog.LeagueGameLog(**params).get_data_frames()[0]
+
+  # The log has a row per team; the away team's matchup reads "BOS @ NYK"
+  games = game_log[game_log.MATCHUP.str.contains('@')].drop_duplicates('GAME_ID').copy()
+  games['AWAY_TEAM'] = games.MATCHUP.str[:3]
+  games['HOME_TEAM'] = games.MATCHUP.str[-3:]
+  return games[GAME_FIELDS].sort_values('GAME_ID').reset_index(drop=True)
+
+
+class EmptyPlayByPlay(Exception):
+  """Raised for a game whose play-by-play came back without events (not published yet, or a bad response)."""
+
+
+def fetch_game(game, store):
+  """
+  Fetch one game's play-by-play, tag it with the game details and store it. An empty result raises
+  EmptyPlayByPlay instead, so the game isn't marked done and is fetched again on the next run.
+  """
+  pbp = playbyplayv2.PlayByPlayV2(game_id=game.GAME_ID).get_data_frames()[0]
+  if pbp.empty:
+    raise EmptyPlayByPlay(f"No play-by-play events for game {game.GAME_ID}")
+  for field in GAME_FIELDS[1:]:
+    pbp[field] = getattr(game, field)
+  return store.write(game.GAME_ID, pbp)
+
+
+def ingest_pbp(season=Season.default, last_n_days=None, store=None, workers=4, rates=None, offline=False):
+  """
+  Fetch play-by-play for every game of the season (or of the last `last_n_days` days) that isn't
+  stored yet, concurrently under the stats.nba.com rate limit, and return those games' events.
+  Each game is stored as soon as it arrives, so rerunning after a failure picks up where it stopped.
+  `rates` overrides DEFAULT_RATES; stats.nba.com's is applied to every request, the game log included.
+  `offline` answers every request from the response cache instead of the network.
+  """
+  rates = DEFAULT_RATES if rates is None else rates
+  StatsHTTP.install(offline=offline, bucket=TokenBucket(*rates[STATS_HOST]))
+  store = store or PBPStore(season)
+  games = get_games(season, last_n_days)
+  missing = games[~games.GAME_ID.map(store.__contains__)]
+  print(f"{len(games) - len(missing)} of {len(games)} games already stored in {store.root}")
+
+  scheduler = FetchScheduler(max_workers=workers, rates={})
+  for game in missing.itertuples(index=False):
+    # Optional, so one bad game doesn't stop the others; it's fetched again next run
+    scheduler.add(game.GAME_ID, lambda game=game: fetch_game(game, store), host=STATS_HOST, optional=True)
+  scheduler.run()
+
+  if scheduler.errors:
+    print(f"{len(scheduler.errors)} games failed and will be retried on the next run: {sorted(scheduler.errors)}")
+  return store.read(games.GAME_ID.tolist())
+
+
+def get_new_pbp(last_n_days=7, season=Season.default):
+  """
+  Possession-tagged play-by-play for the games of the last `last_n_days` days,
+  fetching only ones not stored yet.
+  """
+  return tag_possessions(ingest_pbp(season, last_n_days=last_n_days))
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description="Ingest play-by-play into data/pbp")
+  parser.add_argument('--season', default=Season.default)
+  parser.add_argument('--last-n-days', type=int, default=None, help="only games from the last N days")
+  parser.add_argument('--workers', type=int, default=4)
+  parser.add_argument('--offline', action='store_true', help="Replay cached API responses instead of hitting the network")
+  args = parser.parse_args()
+
+  pbp = ingest_pbp(args.season, last_n_days=args.last_n_days, workers=args.workers, offline=args.offline)
+  print(f"{len(pbp)} events from {pbp.GAME_ID.nunique() if len(pbp) else 0} games")
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import threading
+
+from functools import partial
+from pathlib import Path
+
+from utils.Files import atomic_write
+
+MANIFEST = Path(__file__).parent.parent / "data" / "manifest.json"
+
+
+def _update(h, value):
+  # Feed a value into the hash, tagged with its type so e.g. 1 and "1" differ.
+  # numpy and pandas are only imported once there's data to hash, and are loaded by then anyway.
+  import numpy as np
+  import pandas as pd
+
+  if isinstance(value, pd.DataFrame):
+    h.update(b'frame')
+    _update(h, [str(c) for c in value.columns])
+    _update(h, [str(t) for t in value.dtypes])
+    h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+  elif isinstance(value, pd.Series):
+    h.update(b'series')
+    _update(h, [str(value.name), str(value.dtype)])
+    h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+  elif isinstance(value, np.ndarray):
+    h.update(b'array' + str(value.dtype).encode() + str(value.shape).encode())
+    h.update(np.ascontiguousarray(value).tobytes())
+  elif isinstance(value, (list, tuple)):
+    h.update(b'list%d' % len(value))
+    for item in value:
+      _update(h, item)
+  elif isinstance(value, dict):
+    h.update(b'dict%d' % len(value))
+    for key in sorted(value, key=str):
+      _update(h, key)
+      _update(h, value[key])
+  elif isinstance(value, Path):
+    h.update(b'file' + file_hash(value).encode())
+  else:
+    h.update(type(value).__name__.encode() + repr(value).encode())
+
+
+def content_hash(*values):
+  """sha256 of the contents of frames, arrays, files (as Paths) and plain Python values."""
+  h = hashlib.sha256()
+  _update(h, values)
+  return h.hexdigest()
+
+
+def bound_arguments(fn):
+  """The positional and keyword arguments bound to `fn` by (possibly nested) functools.partial, as a dict."""
+  args, keywords = [], {}
+  while isinstance(fn, partial):
+    args[:0] = fn.args
+    keywords = {**fn.keywords, **keywords}
+    fn = fn.func
+  return {'args': args, 'keywords': keywords}
+
+
+def file_hash(path, chunk_size=1 << 20):
+  """sha256 of a file's bytes."""
+  h = hashlib.sha256()
+  with open(path, 'rb') as f:
+    for chunk in iter(lambda: f.read(chunk_size), b''):
+      h.update(chunk)
+  return h.hexdigest()
+
+
+class Pipeline:
+  """
+  Skip-if-unchanged bookkeeping for the stages of a run. Each stage records a content hash of
+  its inputs and of the files it writes in a manifest (data/manifest.json, committed alongside
+  the artifacts); a stage whose inputs hash the same as last time, and whose files are still
+  as it left them, isn't run again. `changed` collects every file that actually changed.
+  """
+
+  def __init__(self, path=MANIFEST):
+    self.path = Path(path)
+    self.manifest = json.loads(self.path.read_text()) if self.path.exists() else {}
+    self.ran = []
+    self.skipped = []
+    self.changed = []
+    self._lock = threading.Lock()
+
+  def fresh(self, name, inputs):
+    """Whether stage `name` already ran on these inputs (a content_hash) and its files are untouched."""
+    entry = self.manifest.get(name)
+    if entry is None or entry['inputs'] != inputs:
+      return False
+    return all(Path(p).exists() and file_hash(p) == h for p, h in entry['outputs'].items())
+
+  def record(self, name, inputs, outputs=()):
+    """Record that stage `name` ran on `inputs`, noting which of its `outputs` files changed."""
+    previous = self.manifest.get(name, {}).get('outputs', {})
+    hashes = {str(p): file_hash(p) for p in outputs if Path(p).exists()}
+    with self._lock:
+      self.manifest[name] = {'inputs': inputs, 'outputs': hashes}
+      self.ran.append(name)
+      self.changed.extend(p for p, h in hashes.items() if previous.get(p) != h)
+
+  def inputs(self, fn, args, key=None, params=None):
+    """
+    The hash a stage of `fn` records for a call with `args`: the arguments (or `key(*args)`) together
+    with `params`, by default the arguments bound to `fn` with partial (e.g. the season).
+    """
+    params = bound_arguments(fn) if params is None else params
+    return content_hash(params, *(key(*args) if key else args))
+
+  def stage(self, name, fn, outputs=(), key=None, params=None):
+    """
+    Wrap `fn` as stage `name`, writing the `outputs` files. The wrapper hashes its call (see `inputs`)
+    and only calls `fn` when that changed, returning None when skipped. Its `fresh(*args)` tells
+    whether a call would be skipped, so work only the stage needs can be skipped too.
+    """
+    def run(*args):
+      inputs = self.inputs(fn, args, key, params)
+      if self.fresh(name, inputs):
+        with self._lock:
+          self.skipped.append(name)
+        print(f"{name}: inputs unchanged, skipping")
+        return None
+      result = fn(*args)
+      self.record(name, inputs, outputs)
+      return result
+
+    run.fresh = lambda *args: self.fresh(name, self.inputs(fn, args, key, params))
+    return run
+
+  def save(self, changed_list=None):
+    """Write the manifest, and the changed files one per line to `changed_list` if given."""
+    with atomic_write(self.path) as tmp:
+      tmp.write_text(json.dumps(self.manifest, indent=2, sort_keys=True) + '\n')
+
+    changed = sorted(set(self.changed))
+    if changed_list:
+      Path(changed_list).write_text(''.join(f"{p}\n" for p in changed))
+
+    print(f"Ran {len(self.ran)} stages, skipped {len(self.skipped)} with unchanged inputs")
+    print(f"{len(changed)} artifacts changed" + (": " + ", ".join(changed) if changed else ""))
+    return changed
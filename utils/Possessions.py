@@ -0,0 +1,157 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from concurrent.futures import ProcessPoolExecutor
+
+# EVENTMSGACTIONTYPE of the last free throw of a trip: 1 of 1, 2 of 2, 3 of 3
+LAST_FREE_THROW = [10, 12, 15]
+# Turnovers and period ends always hand the ball over
+POSSESSION_ENDING = [5, 13]
+
+# Columns compared against the next event in the same game
+SHIFT_COLUMNS = ['EVENTMSGTYPE', 'EVENTMSGACTIONTYPE', 'PCTIME_SECONDS', 'PLAYER1_TEAM_ID', 'PLAYER1_ID']
+
+
+def pad_game_ids(game_ids):
+  """GAME_IDs as 10 character strings, restoring the leading zeros a CSV round trip drops."""
+  return game_ids.astype(str).str.zfill(10)
+
+
+def read_pbp_csv(path):
+  """Load a play-by-play CSV saved from one of the notebooks, with GAME_IDs kept as padded strings."""
+  pbp = pd.read_csv(path, dtype={'GAME_ID': str}, low_memory=False)
+  pbp['GAME_ID'] = pad_game_ids(pbp['GAME_ID'])
+  return pbp
+
+
+def _parse_unique(values, parse):
+  # A season has a few hundred distinct clocks and a few thousand distinct scores across millions
+  # of events, so parse each distinct string once and broadcast back by factorized code
+  codes, uniques = pd.factorize(values)
+  return np.array([parse(u) for u in uniques])[codes]
+
+
+def clock_seconds(clock):
+  """Seconds left in the period from "MM:SS" clock strings."""
+  return _parse_unique(clock, lambda c: int(c.split(':')[0]) * 60 + int(c.split(':')[1]))
+
+
+def _scores(score):
+  # "AWAY - HOME" strings to an (n, 2) int array
+  return _parse_unique(score, lambda s: [int(x) for x in s.split(' - ')]).reshape(-1, 2)
+
+
+def shift_rows(pbp):
+  """
+  Order the events of each game, fill in the running score and add the next event's details
+  (the *_SHIFT columns) that the possession rules look at. Nothing is shifted across games.
+  """
+  df = pbp.copy()
+  df['PCTIME_SECONDS'] = clock_seconds(df['PCTIMESTRING'])
+
+  keys = ['GAME_DATE'] if 'GAME_DATE' in df else []
+  df = df.sort_values(keys + ['GAME_ID', 'PERIOD', 'PCTIME_SECONDS', 'EVENTNUM'],
+                      ascending=[True] * len(keys) + [True, True, False, True], kind='stable')
+  df = df.reset_index(drop=True)
+
+  game = df['GAME_ID']
+  new_game = (game != game.shift()).to_numpy()
+
+  # Scores are only reported when they change, so carry the last one forward within each game
+  tip_off = (df['EVENTMSGTYPE'] == 12) & (df['PERIOD'] == 1)
+  df.loc[tip_off, 'SCORE'] = "0 - 0"
+  df['SCORE'] = df.groupby('GAME_ID', sort=False)['SCORE'].ffill().fillna("0 - 0")
+
+  grouped = df.groupby('GAME_ID', sort=False)
+  for column in SHIFT_COLUMNS:
+    df[f'{column}_SHIFT'] = grouped[column].shift(-1)
+  df['SCORE_SHIFT'] = grouped['SCORE'].shift(1)
+  df.loc[tip_off | new_game, 'SCORE_SHIFT'] = "0 - 0"
+  return df
+
+
+def possession_ends(df):
+  """Whether each event ends the possession, from the event and the one after it."""
+  event = df['EVENTMSGTYPE'].to_numpy()
+  next_event = df['EVENTMSGTYPE_SHIFT'].to_numpy()
+  team = df['PLAYER1_TEAM_ID'].to_numpy(dtype=np.float64)
+  next_team = df['PLAYER1_TEAM_ID_SHIFT'].to_numpy(dtype=np.float64)
+  # NaN != NaN, as it was for the row-wise checks
+  team_changes = team != next_team
+
+  # A made shot, unless the next event is a foul at the same time (an and-one)
+  and_one = (next_event == 6) & (df['PCTIME_SECONDS'].to_numpy() == df['PCTIME_SECONDS_SHIFT'].to_numpy())
+  made = (event == 1) & ~and_one
+  # A miss, unless the same team has the next event (an offensive rebound)
+  missed = (event == 2) & team_changes
+  # The last free throw of a trip, unless it's missed and the shooting team rebounds
+  free_throw = (event == 3) & df['EVENTMSGACTIONTYPE'].isin(LAST_FREE_THROW).to_numpy() & ((next_event != 4) | team_changes)
+
+  return made | missed | free_throw | np.isin(event, POSSESSION_ENDING)
+
+
+def _first_possession(df):
+  # Per game: the team the opening tip goes to, or the team that didn't commit the first (jump ball) violation
+  teams = df.drop_duplicates('GAME_ID').set_index('GAME_ID')[['HOME_TEAM', 'AWAY_TEAM']]
+
+  tips = df[df['EVENTMSGTYPE'] == 10].drop_duplicates('GAME_ID').set_index('GAME_ID')['PLAYER3_TEAM_ABBREVIATION']
+  violations = df[df['EVENTMSGTYPE'] == 7].drop_duplicates('GAME_ID').set_index('GAME_ID')['PLAYER1_TEAM_ABBREVIATION']
+  violations = violations.reindex(teams.index)
+
+  first = tips.reindex(teams.index)
+  no_tip = ~teams.index.isin(tips.index)
+  first[no_tip] = teams['AWAY_TEAM'].where(violations == teams['HOME_TEAM'], teams['HOME_TEAM'])[no_tip]
+
+  missing = teams.index[no_tip & violations.isna().to_numpy()]
+  if len(missing):
+    raise ValueError(f"No valid first possession found for GAME_ID {missing[0]}")
+  return teams, first
+
+
+def possession_teams(df):
+  """The team in possession at each event, flipping after every possession end within a game."""
+  teams, first = _first_possession(df)
+  home, away = teams['HOME_TEAM'], teams['AWAY_TEAM']
+  # Flipping goes to the home team from anything but the home team
+  flipped = away.where(first == home, home)
+  flipped_back = away.where(flipped == home, home)
+
+  game = df['GAME_ID']
+  ends = df['POSSESSION_END'].to_numpy(dtype=np.int64)
+  before = df.assign(_END=ends).groupby('GAME_ID', sort=False)['_END'].cumsum().to_numpy() - ends
+
+  return np.select([before == 0, before % 2 == 1],
+                   [game.map(first).to_numpy(), game.map(flipped).to_numpy()],
+                   game.map(flipped_back).to_numpy())
+
+
+def tag_games(pbp):
+  """Possession-annotate play-by-play for whole games, in one vectorized pass."""
+  df = shift_rows(pbp)
+  df['POSSESSION_END'] = possession_ends(df)
+  df['POSSESSION_TEAM_ABBREVIATION'] = possession_teams(df)
+
+  df['SCORE_CHANGE'] = (_scores(df['SCORE']) - _scores(df['SCORE_SHIFT'])).max(axis=1)
+  return df
+
+
+def tag_possessions(pbp, processes=None, min_rows=500000):
+  """
+  Possession-annotate play-by-play for any number of games, which need HOME_TEAM and AWAY_TEAM
+  columns (as stored by PBPIngest). Frames of more than `min_rows` events are split into
+  blocks of whole games and tagged across `processes` worker processes (default one per core).
+  """
+  processes = processes or os.cpu_count() or 1
+  if processes == 1 or len(pbp) <= min_rows:
+    return tag_games(pbp)
+
+  game_ids = pbp['GAME_ID'].unique()
+  blocks = [pbp[pbp['GAME_ID'].isin(ids)] for ids in np.array_split(game_ids, processes)]
+  with ProcessPoolExecutor(max_workers=processes) as pool:
+    tagged = list(pool.map(tag_games, blocks))
+
+  keys = ['GAME_DATE'] if 'GAME_DATE' in pbp else []
+  df = pd.concat(tagged, ignore_index=True)
+  return df.sort_values(keys + ['GAME_ID'], kind='stable').reset_index(drop=True)
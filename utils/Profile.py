@@ -0,0 +1,210 @@
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+
+from contextlib import ContextDecorator
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+
+PROFILE_DIR = Path(__file__).parent.parent / "data" / "profiles"
+
+# Profiles kept in PROFILE_DIR; older ones are deleted as new ones are written
+KEEP_PROFILES = 30
+
+
+class _Stage(ContextDecorator):
+  # Times its block (or decorated function) into the profile, as a success or failure
+  def __init__(self, profile, name):
+    self.profile = profile
+    self.name = name
+
+  def __enter__(self):
+    self._start = time.perf_counter()
+    return self
+
+  def __exit__(self, exc_type, exc, tb):
+    self.profile.add_stage(self.name, time.perf_counter() - self._start, error=exc)
+    return False
+
+
+class RunProfile:
+  """
+  Where one run's time went: seconds per stage (and time spent queued on a rate limit), and
+  latency, rate limit wait, body size, status and cache hit of every stats.nba.com request. Written as JSON to
+  data/profiles, where `python -m utils.Profile compare` checks it against earlier runs.
+  """
+
+  def __init__(self):
+    self.started = datetime.now()
+    self._start = time.perf_counter()
+    self.stages = {}
+    self.requests = []
+    self.retries = {}
+    self._lock = threading.Lock()
+
+  def stage(self, name):
+    """Context manager (or decorator) timing a stage."""
+    return _Stage(self, name)
+
+  def add_stage(self, name, seconds, wait=0.0, error=None):
+    with self._lock:
+      stage = self.stages.setdefault(name, {'seconds': 0.0, 'wait': 0.0, 'calls': 0, 'errors': []})
+      stage['seconds'] += seconds
+      stage['wait'] += wait
+      stage['calls'] += 1
+      if error is not None:
+        stage['errors'].append(f"{type(error).__name__}: {error}")
+
+  def request(self, endpoint, parameters, seconds, size, status, cached, error=None, wait=0.0):
+    """Record one stats.nba.com request; the signature of a StatsHTTP request hook."""
+    with self._lock:
+      self.requests.append({
+        'endpoint': endpoint,
+        'parameters': {k: str(v) for k, v in parameters.items()},
+        'seconds': seconds,
+        'wait': wait,
+        'bytes': size,
+        'status': status,
+        'cached': cached,
+        'error': None if error is None else f"{type(error).__name__}: {error}",
+      })
+
+  def retry(self, name):
+    """Count a retry of `name` (a function or stage)."""
+    with self._lock:
+      self.retries[name] = self.retries.get(name, 0) + 1
+
+  def endpoints(self):
+    """Per endpoint: requests, cache hits, total seconds, rate limit wait and bytes, statuses and retries."""
+    summary = {}
+    for r in self.requests:
+      s = summary.setdefault(r['endpoint'], {'requests': 0, 'cached': 0, 'seconds': 0.0, 'wait': 0.0, 'bytes': 0,
+                                             'statuses': {}, 'errors': 0, 'retries': 0, '_seen': set()})
+      s['requests'] += 1
+      s['cached'] += r['cached']
+      s['seconds'] += r['seconds']
+      s['wait'] += r['wait']
+      s['bytes'] += r['bytes'] or 0
+      s['errors'] += r['error'] is not None
+      status = str(r['status'])
+      s['statuses'][status] = s['statuses'].get(status, 0) + 1
+      # The same request going out to the network again within a run is a retry
+      if not r['cached']:
+        key = json.dumps(r['parameters'], sort_keys=True)
+        s['retries'] += key in s['_seen']
+        s['_seen'].add(key)
+    for s in summary.values():
+      del s['_seen']
+    return summary
+
+  def to_dict(self):
+    with self._lock:
+      return {
+        'started': self.started.isoformat(timespec='seconds'),
+        'seconds': time.perf_counter() - self._start,
+        'argv': sys.argv,
+        'stages': {name: dict(stage) for name, stage in self.stages.items()},
+        'endpoints': self.endpoints(),
+        'retries': dict(self.retries),
+        'requests': list(self.requests),
+      }
+
+  def write(self, path=PROFILE_DIR, keep=KEEP_PROFILES):
+    """Write the profile to `path` as <start time>.json, keeping the newest `keep` profiles."""
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    profile_file = path / f"{self.started.strftime('%Y-%m-%dT%H%M%S')}.json"
+    profile_file.write_text(json.dumps(self.to_dict(), indent=2, sort_keys=True) + '\n')
+    for old in sorted(path.glob('*.json'))[:-keep]:
+      old.unlink()
+    print(f"Run profile written to {profile_file}")
+    return profile_file
+
+
+_profile = None
+
+def get_profile():
+  """The process-wide run profile."""
+  global _profile
+  if _profile is None:
+    _profile = RunProfile()
+  return _profile
+
+
+def timed(name=None):
+  """Decorator timing every call of a function as a stage of the process-wide profile."""
+  def decorator(fn):
+    stage_name = name or fn.__name__
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+      with get_profile().stage(stage_name):
+        return fn(*args, **kwargs)
+    return wrapper
+  return decorator
+
+
+def load_profiles(path=PROFILE_DIR):
+  """Every profile in `path`, oldest first."""
+  return [json.loads(p.read_text()) for p in sorted(Path(path).glob('*.json'))]
+
+
+def _metrics(profile):
+  # Comparable numbers from one profile: stage seconds, and network seconds and bytes per endpoint
+  metrics = {'run seconds': profile['seconds']}
+  for name, stage in profile['stages'].items():
+    metrics[f"stage {name} seconds"] = stage['seconds']
+  for endpoint, s in profile['endpoints'].items():
+    metrics[f"{endpoint} seconds"] = s['seconds']
+    metrics[f"{endpoint} bytes"] = s['bytes']
+    metrics[f"{endpoint} retries"] = s['retries']
+  return metrics
+
+
+def compare(profiles, ratio=1.5, min_seconds=1.0):
+  """
+  Regressions of the last profile against the median of the others: any metric at least `ratio`
+  times its median (and, for seconds, at least `min_seconds` slower), or retries that weren't there.
+  Returns (metric, median, latest) tuples.
+  """
+  *previous, latest = [_metrics(p) for p in profiles]
+  regressions = []
+  for metric, value in latest.items():
+    history = [p[metric] for p in previous if metric in p]
+    if not history:
+      continue
+    median = statistics.median(history)
+    if metric.endswith('retries'):
+      flagged = value > median
+    elif metric.endswith('seconds'):
+      flagged = value >= median * ratio and value - median >= min_seconds
+    else:
+      flagged = value >= median * ratio and value > 0
+    if flagged:
+      regressions.append((metric, median, value))
+  return regressions
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description="Compare the latest run profile against earlier runs")
+  parser.add_argument('command', choices=['compare'])
+  parser.add_argument('--path', default=PROFILE_DIR)
+  parser.add_argument('--runs', type=int, default=10, help="earlier runs to compare against")
+  parser.add_argument('--ratio', type=float, default=1.5, help="flag metrics this many times their median")
+  parser.add_argument('--min-seconds', type=float, default=1.0, help="ignore slowdowns smaller than this")
+  args = parser.parse_args()
+
+  profiles = load_profiles(args.path)[-(args.runs + 1):]
+  if len(profiles) < 2:
+    sys.exit(f"Need at least two profiles in {args.path} to compare")
+
+  regressions = compare(profiles, args.ratio, args.min_seconds)
+  print(f"Latest run ({profiles[-1]['started']}) against the median of {len(profiles) - 1} earlier runs:")
+  for metric, median, value in regressions:
+    print(f"  REGRESSION {metric}: {median:,.2f} -> {value:,.2f}")
+  if not regressions:
+    print("  no regressions")
+  sys.exit(1 if regressions else 0)
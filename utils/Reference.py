@@ -0,0 +1,73 @@
+import re
+import threading
+import unicodedata
+
+from functools import lru_cache
+from nba_api.stats.static import players, teams
+from nba_api.stats.endpoints import playerindex
+
+# Generational suffixes dropped when matching names ("Jaren Jackson Jr." == "jaren jackson")
+NAME_SUFFIXES = {'jr', 'sr', 'ii', 'iii', 'iv', 'v'}
+
+
+def normalize_name(name):
+  """Lowercase a name and drop accents, punctuation and suffixes, so "Luka Dončić" matches "luka doncic"."""
+  name = unicodedata.normalize('NFKD', name)
+  name = ''.join(c for c in name if not unicodedata.combining(c)).lower()
+  words = re.sub(r"[^a-z0-9 ]+", ' ', name.replace("'", '').replace('.', '')).split()
+  return ' '.join(w for w in words if w not in NAME_SUFFIXES)
+
+
+class ReferenceIndex:
+  """
+  Players, teams and the active PlayerIndex snapshot, each loaded once per process,
+  with dict lookups by id, normalized name and jersey number.
+  """
+
+  def __init__(self):
+    self.players = {p['id']: p for p in players.get_players()}
+    self.teams = {t['id']: t for t in teams.get_teams()}
+    self.team_abbreviations = {t['id']: t['abbreviation'] for t in self.teams.values()}
+
+    # Active players go in last, so they win any clash with a retired namesake
+    self.player_ids = {}
+    for p in sorted(self.players.values(), key=lambda p: p['is_active']):
+      self.player_ids[normalize_name(p['full_name'])] = p['id']
+
+    self._player_index = None
+    self._jerseys = None
+    self._lock = threading.Lock()
+
+  def player_id(self, name):
+    """Player id for a full name, ignoring case, accents and suffixes (None if unknown)."""
+    return self.player_ids.get(normalize_name(name))
+
+  def player(self, player_id):
+    return self.players.get(player_id)
+
+  def team_abbreviation(self, team_id):
+    return self.team_abbreviations.get(team_id)
+
+  @property
+  def player_index(self):
+    """The active PlayerIndex frame (jerseys, positions, bio details), requested on first use only."""
+    with self._lock:
+      if self._player_index is None:
+        self._player_index = playerindex.PlayerIndex(active_nullable=1).get_data_frames()[0]
+    return self._player_index
+
+  def players_by_jersey(self, jersey, team_id=None):
+    """Ids of active players wearing `jersey`, optionally only on `team_id`."""
+    if self._jerseys is None:
+      index = self.player_index
+      jerseys = {}
+      for person_id, team, number in zip(index.PERSON_ID.tolist(), index.TEAM_ID.tolist(), index.JERSEY_NUMBER.tolist()):
+        jerseys.setdefault(str(number), []).append((team, person_id))
+      self._jerseys = jerseys
+    return [p for team, p in self._jerseys.get(str(jersey), []) if team_id is None or team == team_id]
+
+
+@lru_cache(maxsize=None)
+def reference():
+  """The process-wide reference index."""
+  return ReferenceIndex()
@@ -1,104 +1,151 @@
 import pandas as pd
 import numpy as np
-import yaml
-import os
 from nba_api.stats.endpoints import shotchartdetail
-from nba_api.stats.static import teams
+from utils.Artifacts import write_yaml
+from utils.History import current_season
+from utils.Reference import reference
+from utils.ShotSchema import point_values, typed_shots
+from utils.ShotStore import ingest_shots
 
 # Helper function for number formatting
 def fmt(val):
   return round(val, 3) if pd.notnull(val) else ""
 
-def _season_string_from_end_date(end_date_str):
-  """Convert NBA_SEASON_END (YYYY-MM-DD) to nba_api season string e.g. '2025-26'."""
-  year = int(end_date_str[:4])
-  # The end date falls in the latter year of the season label (e.g. 2026 → 2025-26)
-  return f"{year - 1}-{str(year)[2:]}"
+SHOT_DISTANCE_FIELDS = {
+  'id': 'PLAYER_ID',
+  'name': 'PLAYER_NAME',
+  'team': 'TEAM_ABBREVIATION',
+  'fga': 'ALL_FGA',
+  'all_avg_dist': ('ALL_ALL_AVG_DISTANCE', fmt),
+  'thr_avg_dist': ('ALL_3PT_AVG_DISTANCE', fmt),
+  'two_avg_dist': ('ALL_2PT_AVG_DISTANCE', fmt),
+  'made_fga': 'MADE_FGA',
+  'made_all_avg_dist': ('MADE_ALL_AVG_DISTANCE', fmt),
+  'made_thr_avg_dist': ('MADE_3PT_AVG_DISTANCE', fmt),
+  'made_two_avg_dist': ('MADE_2PT_AVG_DISTANCE', fmt),
+  'miss_fga': 'MISS_FGA',
+  'miss_all_avg_dist': ('MISS_ALL_AVG_DISTANCE', fmt),
+  'miss_thr_avg_dist': ('MISS_3PT_AVG_DISTANCE', fmt),
+  'miss_two_avg_dist': ('MISS_2PT_AVG_DISTANCE', fmt),
+}
+
+def shooting_distance_csv(season):
+  """The season's shot distance csv, e.g. SHOOTING_DISTANCE_24-25.csv for '2024-25'."""
+  return f'SHOOTING_DISTANCE_{season[2:]}.csv'
+
+def fetch_shots(incremental=False, season=None, offline=False):
+  """
+  Fetch every FGA in the league for `season` (default the current one, see History.current_season)
+  up to date of request, as a typed frame (see ShotSchema).
+  With `incremental`, only games since the last run are requested and merged into the local shot store,
+  which `offline` reads as it stands.
+  """
+  season = season or current_season()
+
+  if incremental:
+    return ingest_shots(season, offline=offline)
 
-def get_shots_yml():
+  # NBA API request
+  return typed_shots(shotchartdetail.ShotChartDetail(team_id=0, player_id=0, context_measure_simple='FGA',
+                                                     season_nullable=season).get_data_frames()[0], report=True)
+
+def agg_groups(df, by, value, splits):
   """
-  Using shot chart data from NBA_API, aggregate and re-format data to return shooting distance data.
-  For all players, for current season up to date of request.
-  Saves result to yaml file called 'shot_distance.yml'
+  Count, sum and mean of `value` for each `by` group crossed with every combination of `splits`, in one pass.
+  `splits` maps a split name to (codes, labels): an integer code per row indexing into labels, or -1 to leave
+  the row out of the labelled levels. Each split also gets an 'ALL' level covering every row.
+  Returns a frame indexed by the sorted `by` keys, with (*split levels, 'COUNT'/'SUM'/'MEAN') columns.
+  """
+  cell, keys = pd.factorize(df[by], sort=True)
+  values = df[value].to_numpy(dtype=np.float64)
+  valid = (cell >= 0) & ~np.isnan(values)
+
+  # Fold each split into a single integer cell code; the extra slot per split holds unlabelled rows
+  shape = [len(keys)]
+  cell = cell.astype(np.int64)
+  for codes, labels in splits.values():
+    n = len(labels)
+    codes = np.asarray(codes)
+    cell = cell * (n + 1) + np.where((codes >= 0) & (codes < n), codes, n)
+    shape.append(n + 1)
+
+  size = int(np.prod(shape))
+  count = np.bincount(cell[valid], minlength=size).reshape(shape)
+  total = np.bincount(cell[valid], weights=values[valid], minlength=size).reshape(shape)
+
+  # Swap each unlabelled slot for an ALL level summing over the whole split
+  for axis in range(1, len(shape)):
+    count = np.concatenate([np.delete(count, -1, axis), count.sum(axis=axis, keepdims=True)], axis=axis)
+    total = np.concatenate([np.delete(total, -1, axis), total.sum(axis=axis, keepdims=True)], axis=axis)
+
+  with np.errstate(invalid='ignore', divide='ignore'):
+    mean = total / count
+
+  levels = [labels + ['ALL'] for _, labels in splits.values()]
+  cells = pd.MultiIndex.from_product(levels)
+  count, total, mean = (a.reshape(len(keys), -1) for a in (count, total, mean))
+  columns = {}
+  for i, combo in enumerate(cells):
+    columns[(*combo, 'COUNT')] = count[:, i]
+    columns[(*combo, 'SUM')] = total[:, i]
+    columns[(*combo, 'MEAN')] = mean[:, i]
+  return pd.DataFrame(columns, index=pd.Index(keys, name=by))
+
+def shot_distances(shotdf):
+  """
+  Aggregate a shot frame into average shooting distances per player: all shots, makes and misses,
+  each split into twos and threes (min. 50 FGA), furthest first.
   """
 
-  # Derive season from env var so post-season API calls still target the right year
-  season_end = os.environ.get('NBA_SEASON_END')
-  season = _season_string_from_end_date(season_end) if season_end else None
-
-  kwargs = dict(team_id=0, player_id=0, context_measure_simple='FGA')
-  if season:
-    kwargs['season_nullable'] = season
-
-  # NBA API requests
-  shotdf = shotchartdetail.ShotChartDetail(**kwargs).get_data_frames()[0]
-  teams_list = teams.get_teams()
-
-  shotdf['POINT_VALUE'] = np.where(shotdf['SHOT_ZONE_BASIC'].str.contains('3'), '3', '2')
-
-  # Create aggregated dataframe for average distances
-  # Masks
-  is_three = shotdf['POINT_VALUE'] == '3'
-  is_two = shotdf['POINT_VALUE'] == '2'
-  made = shotdf['SHOT_MADE_FLAG'] == 1
-  missed = shotdf['SHOT_MADE_FLAG'] == 0
-
-  # Helper for agg
-  def agg_dist(df):
-      return df.groupby('PLAYER_ID').agg(
-          FGA=('SHOT_DISTANCE', 'count'),
-          ALL_AVG_DISTANCE=('SHOT_DISTANCE', 'mean'),
-          _3PT_AVG_DISTANCE=('SHOT_DISTANCE', lambda x: x[is_three.loc[x.index]].mean()),
-          _2PT_AVG_DISTANCE=('SHOT_DISTANCE', lambda x: x[is_two.loc[x.index]].mean())
-      ).rename(columns={
-          '_3PT_AVG_DISTANCE': '3PT_AVG_DISTANCE',
-          '_2PT_AVG_DISTANCE': '2PT_AVG_DISTANCE'
-      })
-
-  # Full stats
-  all_df = agg_dist(shotdf).add_prefix('ALL_')
-  made_df = agg_dist(shotdf[made]).add_prefix('MADE_')
-  miss_df = agg_dist(shotdf[missed]).add_prefix('MISS_')
-
-  # Combine into one df
-  out = (
-      all_df.join(made_df, how='outer')
-            .join(miss_df, how='outer')
-            .reset_index()
-  )
+  # Split every shot by result and point value, then aggregate all combinations in one pass
+  made_flag = shotdf['SHOT_MADE_FLAG'].to_numpy()
+  splits = {
+    'RESULT': (np.select([made_flag == 1, made_flag == 0], [0, 1], -1), ['MADE', 'MISS']),
+    'POINT_VALUE': ((point_values(shotdf) == 3).astype(np.int64), ['2PT', '3PT']),
+  }
+  stats = agg_groups(shotdf, 'PLAYER_ID', 'SHOT_DISTANCE', splits)
+
+  out = pd.DataFrame(index=stats.index)
+  for result in ['ALL', 'MADE', 'MISS']:
+    fga = stats[(result, 'ALL', 'COUNT')]
+    if result != 'ALL':
+      # Players without a make (or miss) have no row in that split, as with an outer join
+      fga = fga.where(fga > 0)
+      fga = fga.astype(np.int64) if not fga.hasnans else fga
+    out[f'{result}_FGA'] = fga
+    out[f'{result}_ALL_AVG_DISTANCE'] = stats[(result, 'ALL', 'MEAN')]
+    out[f'{result}_3PT_AVG_DISTANCE'] = stats[(result, '3PT', 'MEAN')]
+    out[f'{result}_2PT_AVG_DISTANCE'] = stats[(result, '2PT', 'MEAN')]
+  out = out.reset_index()
 
   # Add player names and teams
   names = shotdf[['PLAYER_ID', 'PLAYER_NAME', 'TEAM_ID']].drop_duplicates(subset=['PLAYER_ID'])
   out = out.merge(names, on='PLAYER_ID', how='left')
-  out['TEAM_ABBREVIATION'] = out['TEAM_ID'].map({team['id']: team['abbreviation'] for team in teams_list})
+  out['TEAM_ABBREVIATION'] = out['TEAM_ID'].map(reference().team_abbreviations)
 
   # Filter and re-order
-  out = out[out.ALL_FGA > 50].sort_values('ALL_ALL_AVG_DISTANCE', ascending=False)
+  return out[out.ALL_FGA > 50].sort_values('ALL_ALL_AVG_DISTANCE', ascending=False)
+
+def save_shot_distances(out, season=None):
+  """Save aggregated shot distances to the season's csv and 'shot_distance.yml'."""
 
   if out.empty:
     print("Shot distance data is empty — skipping file writes to preserve existing data.")
     return
 
-  out.to_csv('SHOOTING_DISTANCE_24-25.csv')
-
-  shot_distance_list = [{
-      'id': str(row.PLAYER_ID),
-      'name': str(row.PLAYER_NAME),
-      'team': str(row.TEAM_ABBREVIATION),
-      'fga': str(row.ALL_FGA),
-      'all_avg_dist': fmt(row.ALL_ALL_AVG_DISTANCE),
-      'thr_avg_dist': fmt(row.ALL_3PT_AVG_DISTANCE),
-      'two_avg_dist': fmt(row.ALL_2PT_AVG_DISTANCE),
-      'made_fga': str(row.MADE_FGA),
-      'made_all_avg_dist': fmt(row.MADE_ALL_AVG_DISTANCE),
-      'made_thr_avg_dist': fmt(row.MADE_3PT_AVG_DISTANCE),
-      'made_two_avg_dist': fmt(row.MADE_2PT_AVG_DISTANCE),
-      'miss_fga': str(row.MISS_FGA),
-      'miss_all_avg_dist': fmt(row.MISS_ALL_AVG_DISTANCE),
-      'miss_thr_avg_dist': fmt(row.MISS_3PT_AVG_DISTANCE),
-      'miss_two_avg_dist': fmt(row.MISS_2PT_AVG_DISTANCE),
-  } for _, row in out.iterrows()]
-
-
-  with open('shot_distance.yml', 'w') as stream:
-    yaml.dump(shot_distance_list, stream)
\ No newline at end of file
+  out.to_csv(shooting_distance_csv(season or current_season()))
+
+  write_yaml(out, 'shot_distance.yml', SHOT_DISTANCE_FIELDS)
+
+def get_shots_yml(shotdf=None, season=None):
+  """
+  Using shot chart data from NBA_API, aggregate and re-format data to return shooting distance data.
+  For all players, for `season` (default the current one) up to date of request.
+  Saves result to yaml file called 'shot_distance.yml'
+  Pass an already fetched shot frame as `shotdf` to skip the request.
+  """
+
+  if shotdf is None:
+    shotdf = fetch_shots(season=season)
+
+  save_shot_distances(shot_distances(shotdf), season)
@@ -0,0 +1,202 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from pathlib import Path
+
+from utils.Files import atomic_write
+
+GRID_DIR = Path(__file__).parent.parent / ".cache" / "grids"
+
+# The half court in shot chart units (tenths of a foot, hoop at the origin): sideline to sideline,
+# baseline to halfway line. Shots outside it (heaves from the backcourt) fall in no cell.
+HALF_COURT = (-250.0, 250.0, -47.5, 422.5)
+
+# Shot frame columns the grids are built from
+GRID_COLUMNS = ['PLAYER_ID', 'TEAM_ID', 'LOC_X', 'LOC_Y', 'SHOT_MADE_FLAG']
+
+
+class ShotGrid:
+  """
+  A fixed binning of the half court into square cells, or hexagons as in matplotlib's hexbin,
+  `size` units (tenths of a foot) across. Maps shot locations to integer cell ids, and cell ids
+  back to the polygons that draw them.
+  """
+
+  def __init__(self, kind='hex', size=15, extent=HALF_COURT):
+    if kind not in ('hex', 'square'):
+      raise ValueError(f"Unknown grid kind {kind!r}, expected 'hex' or 'square'")
+    self.kind = kind
+    self.size = size
+    self.extent = tuple(float(e) for e in extent)
+
+    x0, x1, y0, y1 = self.extent
+    # Hexagon rows sit sqrt(3) times their width apart, alternating between two offset lattices
+    self.sx = float(size)
+    self.sy = size * np.sqrt(3) if kind == 'hex' else float(size)
+    self.nx = int(np.ceil((x1 - x0) / self.sx))
+    self.ny = int(np.ceil((y1 - y0) / self.sy))
+    self.n_cells = (self.nx + 1) * (self.ny + 1) + self.nx * self.ny if kind == 'hex' else self.nx * self.ny
+
+  @property
+  def key(self):
+    """Name for the grid's cache folder, e.g. 'hex-15'."""
+    extent = '' if self.extent == HALF_COURT else '_' + '_'.join(f"{e:g}" for e in self.extent)
+    return f"{self.kind}-{self.size:g}{extent}"
+
+  def cells(self, x, y):
+    """Cell id (int64) of every (x, y) location, or -1 outside the grid."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    x0, x1, y0, y1 = self.extent
+    xs = (x - x0) / self.sx
+    ys = (y - y0) / self.sy
+    inside = (x >= x0) & (x < x1) & (y >= y0) & (y < y1)
+
+    if self.kind == 'square':
+      cell = np.floor(ys) * self.nx + np.floor(xs)
+    else:
+      # Nearest centre of the two lattices; the 3 weights rows as far apart as they really are
+      ix1, iy1 = np.rint(xs), np.rint(ys)
+      ix2, iy2 = np.floor(xs), np.floor(ys)
+      d1 = (xs - ix1) ** 2 + 3 * (ys - iy1) ** 2
+      d2 = (xs - ix2 - 0.5) ** 2 + 3 * (ys - iy2 - 0.5) ** 2
+      cell = np.where(d1 <= d2, iy1 * (self.nx + 1) + ix1, (self.nx + 1) * (self.ny + 1) + iy2 * self.nx + ix2)
+    return np.where(inside, cell, -1).astype(np.int64)
+
+  def centers(self):
+    """(x, y) arrays with the centre of every cell, in cell id order."""
+    x0, _, y0, _ = self.extent
+    if self.kind == 'square':
+      cx, cy = np.meshgrid((np.arange(self.nx) + 0.5) * self.sx, (np.arange(self.ny) + 0.5) * self.sy)
+      return x0 + cx.ravel(), y0 + cy.ravel()
+    cx1, cy1 = np.meshgrid(np.arange(self.nx + 1) * self.sx, np.arange(self.ny + 1) * self.sy)
+    cx2, cy2 = np.meshgrid((np.arange(self.nx) + 0.5) * self.sx, (np.arange(self.ny) + 0.5) * self.sy)
+    return x0 + np.concatenate([cx1.ravel(), cx2.ravel()]), y0 + np.concatenate([cy1.ravel(), cy2.ravel()])
+
+  def polygons(self, cells, scale=1.0):
+    """(cells, vertices, 2) outlines of `cells`, each shrunk about its centre by `scale` (scalar or per cell)."""
+    if self.kind == 'square':
+      shape = [self.sx, self.sy] * np.array([[-.5, -.5], [.5, -.5], [.5, .5], [-.5, .5]])
+    else:
+      shape = [self.sx, self.sy / 3] * np.array([[.5, -.5], [.5, .5], [0., 1.], [-.5, .5], [-.5, -.5], [0., -1.]])
+    cx, cy = self.centers()
+    cells = np.asarray(cells)
+    scale = np.broadcast_to(np.asarray(scale, dtype=np.float64), cells.shape)
+    return np.stack([cx[cells], cy[cells]], axis=-1)[:, None, :] + shape[None, :, :] * scale[:, None, None]
+
+
+class ShotGrids:
+  """
+  FGA and FGM in every cell of a ShotGrid for each player, each team and the league, built in one
+  pass over the league shot frame. Counts are (players or teams, cells) int32 arrays; `save` writes
+  them as .npy files that `load` maps into memory, so a chart only pages in the rows it draws.
+  """
+
+  ARRAYS = ['player_ids', 'player_fga', 'player_fgm', 'team_ids', 'team_fga', 'team_fgm', 'league_fga', 'league_fgm']
+
+  def __init__(self, grid, **arrays):
+    self.grid = grid
+    for name in self.ARRAYS:
+      setattr(self, name, arrays[name])
+    self._rows = {
+      'player': {k: i for i, k in enumerate(np.asarray(self.player_ids).tolist())},
+      'team': {k: i for i, k in enumerate(np.asarray(self.team_ids).tolist())},
+    }
+
+  @classmethod
+  def from_shots(cls, shots, grid=None):
+    """Bin a shot frame (LOC_X, LOC_Y, SHOT_MADE_FLAG, PLAYER_ID, TEAM_ID) into `grid` (default 15 unit hexagons)."""
+    grid = grid or ShotGrid()
+    cell = grid.cells(shots['LOC_X'].to_numpy(), shots['LOC_Y'].to_numpy())
+    keep = cell >= 0
+    cell = cell[keep]
+    made = shots['SHOT_MADE_FLAG'].to_numpy()[keep] == 1
+
+    arrays = {}
+    for level, key in [('player', 'PLAYER_ID'), ('team', 'TEAM_ID')]:
+      # Every (group, cell) pair folds into one flat index, so each count is a single bincount
+      codes, ids = pd.factorize(shots[key].to_numpy()[keep], sort=True)
+      flat = codes.astype(np.int64) * grid.n_cells + cell
+      shape = (len(ids), grid.n_cells)
+      arrays[f'{level}_ids'] = np.asarray(ids, dtype=np.int64)
+      arrays[f'{level}_fga'] = np.bincount(flat, minlength=shape[0] * shape[1]).reshape(shape).astype(np.int32)
+      arrays[f'{level}_fgm'] = np.bincount(flat[made], minlength=shape[0] * shape[1]).reshape(shape).astype(np.int32)
+
+    # Every shot belongs to exactly one team, so the league is the sum over teams
+    arrays['league_fga'] = arrays['team_fga'].sum(axis=0, dtype=np.int64)
+    arrays['league_fgm'] = arrays['team_fgm'].sum(axis=0, dtype=np.int64)
+    return cls(grid, **arrays)
+
+  def _counts(self, level, key):
+    i = self._rows[level].get(key)
+    if i is None:
+      zeros = np.zeros(self.grid.n_cells, dtype=np.int32)
+      return zeros, zeros
+    return np.asarray(getattr(self, f'{level}_fga')[i]), np.asarray(getattr(self, f'{level}_fgm')[i])
+
+  def player(self, player_id):
+    """(FGA, FGM) per cell for `player_id`, zeros if they have no shots."""
+    return self._counts('player', player_id)
+
+  def team(self, team_id):
+    """(FGA, FGM) per cell for `team_id`."""
+    return self._counts('team', team_id)
+
+  def league(self):
+    """(FGA, FGM) per cell for the whole league."""
+    return np.asarray(self.league_fga), np.asarray(self.league_fgm)
+
+  def relative(self, fga, fgm):
+    """FG% minus the league's FG% in every cell; nan where `fga` is zero."""
+    league_fga, league_fgm = self.league()
+    with np.errstate(invalid='ignore', divide='ignore'):
+      return fgm / fga - league_fgm / league_fga
+
+  def for_player(self, player_id):
+    """A copy holding only `player_id` and the league, small enough to send to a render worker."""
+    fga, fgm = self.player(player_id)
+    return ShotGrids(self.grid, player_ids=np.array([player_id], dtype=np.int64), player_fga=fga[None], player_fgm=fgm[None],
+                     team_ids=np.empty(0, dtype=np.int64), team_fga=np.empty((0, self.grid.n_cells), dtype=np.int32),
+                     team_fgm=np.empty((0, self.grid.n_cells), dtype=np.int32),
+                     league_fga=np.asarray(self.league_fga), league_fgm=np.asarray(self.league_fgm))
+
+  def save(self, path, key=None):
+    """Write every array to `path` as .npy, then meta.json (grid and `key`), which marks the set complete."""
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    for name in self.ARRAYS:
+      # Through an open file, since np.save given a path appends .npy to it
+      with atomic_write(path / f"{name}.npy") as tmp, open(tmp, 'wb') as f:
+        np.save(f, np.asarray(getattr(self, name)))
+    meta = {'kind': self.grid.kind, 'size': self.grid.size, 'extent': list(self.grid.extent), 'key': key}
+    with atomic_write(path / "meta.json") as tmp:
+      tmp.write_text(json.dumps(meta, indent=2) + '\n')
+
+  @classmethod
+  def load(cls, path, mmap=True):
+    """Grids saved to `path`, memory-mapped read only unless `mmap` is False."""
+    path = Path(path)
+    meta = json.loads((path / "meta.json").read_text())
+    grid = ShotGrid(meta['kind'], meta['size'], meta['extent'])
+    arrays = {name: np.load(path / f"{name}.npy", mmap_mode='r' if mmap else None) for name in cls.ARRAYS}
+    return cls(grid, **arrays)
+
+
+def league_grids(shots, grid=None, path=GRID_DIR):
+  """
+  ShotGrids for the league shot frame, cached in `path`/<grid key>. When the same shots were binned
+  before, the saved arrays are memory-mapped instead of being rebuilt.
+  """
+  from utils.Pipeline import content_hash
+
+  grid = grid or ShotGrid()
+  folder = Path(path) / grid.key
+  key = content_hash(shots[GRID_COLUMNS])
+  meta = folder / "meta.json"
+  if meta.exists() and json.loads(meta.read_text()).get('key') == key:
+    return ShotGrids.load(folder)
+
+  ShotGrids.from_shots(shots, grid).save(folder, key)
+  return ShotGrids.load(folder)
@@ -0,0 +1,30 @@
+import numpy as np
+
+
+class ShotIndex:
+  """
+  A league-wide shot frame sorted once by player, with the row range of every player's shots.
+  Looking a player up is a dict hit and a slice, rather than a boolean mask over the whole league.
+  """
+
+  def __init__(self, shots, key='PLAYER_ID'):
+    order = np.argsort(shots[key].to_numpy(), kind='stable')
+    self.shots = shots.iloc[order].reset_index(drop=True)
+
+    keys, starts = np.unique(self.shots[key].to_numpy(), return_index=True)
+    ends = np.append(starts[1:], len(self.shots))
+    self._slices = {k: (s, e) for k, s, e in zip(keys.tolist(), starts.tolist(), ends.tolist())}
+
+  def __contains__(self, player_id):
+    return player_id in self._slices
+
+  def __len__(self):
+    return len(self._slices)
+
+  def players(self):
+    return list(self._slices)
+
+  def get(self, player_id):
+    """Every shot taken by `player_id`, in league frame order (empty if they have none)."""
+    start, end = self._slices.get(player_id, (0, 0))
+    return self.shots.iloc[start:end]
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+# dtype for every column of the ShotChartDetail frame. Labels repeat across a season's
+# couple of hundred thousand shots, so they're categoricals; numbers get the smallest type that fits.
+SHOT_SCHEMA = {
+  'GRID_TYPE': 'category',
+  'GAME_ID': 'category',
+  'GAME_EVENT_ID': np.int16,
+  'PLAYER_ID': np.int32,
+  'PLAYER_NAME': 'category',
+  'TEAM_ID': np.int32,
+  'TEAM_NAME': 'category',
+  'PERIOD': np.int8,
+  'MINUTES_REMAINING': np.int8,
+  'SECONDS_REMAINING': np.int8,
+  'EVENT_TYPE': 'category',
+  'ACTION_TYPE': 'category',
+  'SHOT_TYPE': 'category',
+  'SHOT_ZONE_BASIC': 'category',
+  'SHOT_ZONE_AREA': 'category',
+  'SHOT_ZONE_RANGE': 'category',
+  'SHOT_DISTANCE': np.int16,
+  'LOC_X': np.int16,
+  'LOC_Y': np.int16,
+  'SHOT_ATTEMPTED_FLAG': np.int8,
+  'SHOT_MADE_FLAG': np.int8,
+  'GAME_DATE': 'category',
+  'HTM': 'category',
+  'VTM': 'category',
+  'POINT_VALUE': np.int8,
+}
+
+# Columns anything downstream reads: the shot store's key and partition, shot distance
+# aggregation, and the shot charts. The rest (constant GRID_TYPE and SHOT_ATTEMPTED_FLAG,
+# EVENT_TYPE repeating SHOT_MADE_FLAG, names available from the reference index) are dropped.
+SHOT_COLUMNS = ['GAME_ID', 'GAME_EVENT_ID', 'GAME_DATE', 'PLAYER_ID', 'PLAYER_NAME', 'TEAM_ID', 'PERIOD',
+                'ACTION_TYPE', 'SHOT_TYPE', 'SHOT_ZONE_BASIC', 'SHOT_ZONE_AREA', 'SHOT_DISTANCE',
+                'LOC_X', 'LOC_Y', 'SHOT_MADE_FLAG', 'POINT_VALUE']
+
+
+def point_values(shots):
+  """2 or 3 for every shot (int8), from whether its SHOT_ZONE_BASIC names a three point zone."""
+  if 'POINT_VALUE' in shots:
+    return shots['POINT_VALUE'].to_numpy(dtype=np.int8)
+  zone = shots['SHOT_ZONE_BASIC'].astype('category')
+  # Only the handful of distinct zones need a string check
+  three = np.asarray(zone.cat.categories.str.contains('3'), dtype=bool)
+  codes = zone.cat.codes.to_numpy()
+  return np.where((codes >= 0) & three[codes], 3, 2).astype(np.int8)
+
+
+def typed_shots(shots, columns=SHOT_COLUMNS, report=False):
+  """
+  The shot frame cast to SHOT_SCHEMA, with a POINT_VALUE column added. Only `columns` are kept
+  (those that exist); pass None to keep every column. With `report`, prints memory before and after.
+  """
+  before = memory_usage(shots) if report else None
+  df = shots.copy() if columns is None else shots[[c for c in columns if c in shots]].copy()
+
+  if 'SHOT_ZONE_BASIC' in shots and (columns is None or 'POINT_VALUE' in columns):
+    df['POINT_VALUE'] = point_values(shots)
+  for column in df.columns:
+    dtype = SHOT_SCHEMA.get(column)
+    if dtype is not None and df[column].dtype != dtype:
+      df[column] = df[column].astype(dtype)
+
+  if report:
+    print(f"Shot frame: {len(df)} rows, {before / 1e6:.1f}MB -> {memory_usage(df) / 1e6:.1f}MB")
+  return df
+
+
+def memory_usage(df):
+  """Bytes used by a frame, including the contents of string columns."""
+  return int(df.memory_usage(deep=True).sum())
+
+
+def memory_report(df):
+  """dtype and bytes of every column, largest first."""
+  usage = df.memory_usage(deep=True, index=False)
+  return pd.DataFrame({'dtype': df.dtypes.astype(str), 'bytes': usage}).sort_values('bytes', ascending=False)
@@ -0,0 +1,87 @@
+import pandas as pd
+
+from datetime import datetime
+from pathlib import Path
+from nba_api.stats.endpoints import shotchartdetail
+
+from utils.Files import atomic_write
+from utils.ShotSchema import typed_shots
+
+STORE_DIR = Path(__file__).parent.parent / "data" / "shots"
+
+# A shot is uniquely identified by its game and the play-by-play event number
+SHOT_KEY = ['GAME_ID', 'GAME_EVENT_ID']
+
+
+class ShotStore:
+  """
+  Local Parquet store of league-wide shot chart rows for one season, partitioned by game date:
+  data/shots/<season>/GAME_DATE=<YYYYMMDD>/shots.parquet
+  Rows are stored with the projected columns and compact dtypes of ShotSchema.
+  """
+
+  def __init__(self, season, path=STORE_DIR):
+    self.season = season
+    self.root = Path(path) / season
+
+  def _partition(self, game_date):
+    return self.root / f"GAME_DATE={game_date}" / "shots.parquet"
+
+  def game_dates(self):
+    """Sorted YYYYMMDD dates that have a stored partition."""
+    return sorted(p.parent.name.split('=', 1)[1] for p in self.root.glob('GAME_DATE=*/shots.parquet'))
+
+  def last_game_date(self):
+    dates = self.game_dates()
+    return dates[-1] if dates else None
+
+  def read(self):
+    """Every stored shot for the season as one frame, in game date order."""
+    dates = self.game_dates()
+    if not dates:
+      return pd.DataFrame()
+    # Partitions' categoricals have different categories, so concatenating falls back to objects
+    return typed_shots(pd.concat([pd.read_parquet(self._partition(d)) for d in dates], ignore_index=True), columns=None)
+
+  def write(self, shots):
+    """Merge new shots into their game date partitions, dropping rows already stored."""
+    if shots.empty:
+      return 0
+
+    written = 0
+    for game_date, day in typed_shots(shots).groupby('GAME_DATE', sort=True, observed=True):
+      path = self._partition(game_date)
+      if path.exists():
+        day = pd.concat([typed_shots(pd.read_parquet(path)), day], ignore_index=True)
+      day = typed_shots(day.drop_duplicates(subset=SHOT_KEY, keep='last'), columns=None)
+      # Only the categories the partition uses, so storing the same shots again writes the same bytes
+      day = day.apply(lambda c: c.cat.remove_unused_categories() if isinstance(c.dtype, pd.CategoricalDtype) else c)
+      with atomic_write(path) as tmp:
+        day.to_parquet(tmp, index=False)
+      written += len(day)
+    return written
+
+
+def ingest_shots(season, store=None, offline=False, **kwargs):
+  """
+  Bring the season's shot store up to date and return every stored shot.
+  Only games from the last ingested date onwards are requested; that date is fetched again
+  because games still in progress at the previous run would only be partially stored.
+  `offline` returns the stored shots as they are, since the request for the games since the
+  last stored date was never made (and so never cached); an empty store is still requested.
+  """
+  store = store or ShotStore(season)
+  last = store.last_game_date()
+  if offline and last:
+    print(f"Offline, using the shots stored in {store.root} up to {last}")
+    return store.read()
+
+  params = dict(team_id=0, player_id=0, context_measure_simple='FGA', season_nullable=season)
+  if last:
+    params['date_from_nullable'] = datetime.strptime(last, '%Y%m%d').strftime('%m/%d/%Y')
+  params.update(kwargs)
+
+  new = shotchartdetail.ShotChartDetail(**params).get_data_frames()[0]
+  print(f"Ingested {len(new)} shots since {last or 'start of season'} into {store.root}")
+  store.write(new)
+  return store.read()
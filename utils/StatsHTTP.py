@@ -0,0 +1,507 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from concurrent.futures import Future
+from pathlib import Path
+from urllib.parse import urlencode
+
+from nba_api.stats.library import http as http_module
+from nba_api.stats.library.http import NBAStatsHTTP, NBAStatsResponse
+
+from utils.Files import atomic_write
+from utils.Profile import timed
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(__file__).parent.parent / ".cache" / "nba_api"
+
+# Seconds a cached response stays fresh, by endpoint. Player index and tracking data
+# barely move within a day; shot data changes as games finish.
+DEFAULT_TTL = 6 * 60 * 60
+ENDPOINT_TTLS = {
+    'playerindex': 24 * 60 * 60,
+    'leaguedashptstats': 12 * 60 * 60,
+    'leagueleaders': 6 * 60 * 60,
+    'leaguedashplayershotlocations': 6 * 60 * 60,
+    'shotchartdetail': 3 * 60 * 60,
+}
+
+
+class OfflineCacheMiss(Exception):
+    """Raised in offline mode when a request has no cached response to replay."""
+
+
+class ResponseCache:
+    """
+    On-disk cache of gzip-compressed stats.nba.com response bodies.
+    Responses are keyed by endpoint and normalized parameters, expire after a per-endpoint TTL,
+    and the least recently used entries are evicted once the cache grows past `max_bytes`.
+    Identical requests in flight at the same time are coalesced into a single request.
+    """
+
+    def __init__(self, path=CACHE_DIR, max_bytes=512 * 1024 * 1024, ttls=None, default_ttl=DEFAULT_TTL):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.ttls = ENDPOINT_TTLS if ttls is None else ttls
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    @staticmethod
+    def key(endpoint, parameters):
+        # nba_api sends None as an empty value and sorts parameters before sending
+        normalized = sorted((k, '' if v is None else str(v).strip()) for k, v in parameters.items())
+        return hashlib.sha1(f"{endpoint.lower()}?{urlencode(normalized)}".encode()).hexdigest()
+
+    def _files(self, key):
+        return self.path / f"{key}.json.gz", self.path / f"{key}.meta.json"
+
+    def lookup(self, endpoint, parameters, ignore_ttl=False):
+        """Return the cached (body_file, status_code, url) for a request without reading the body, or None."""
+        body_file, meta_file = self._files(self.key(endpoint, parameters))
+        try:
+            meta = json.loads(meta_file.read_text())
+            if not ignore_ttl and time.time() - meta['stored_at'] > self.ttls.get(endpoint.lower(), self.default_ttl):
+                return None
+            # Touching the body keeps the mtime ordering usable for LRU eviction
+            os.utime(body_file)
+        except (OSError, ValueError, KeyError):
+            return None
+        return body_file, meta['status_code'], meta['url']
+
+    def get(self, endpoint, parameters, ignore_ttl=False):
+        """Return the cached (contents, status_code, url) for a request, or None."""
+        found = self.lookup(endpoint, parameters, ignore_ttl)
+        if found is None:
+            return None
+        body_file, status_code, url = found
+        try:
+            with gzip.open(body_file, 'rt', encoding='utf-8') as f:
+                return f.read(), status_code, url
+        except (OSError, ValueError):
+            return None
+
+    def put(self, endpoint, parameters, contents, status_code, url):
+        key = self.key(endpoint, parameters)
+        body_file, meta_file = self._files(key)
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        with atomic_write(body_file) as tmp, gzip.open(tmp, 'wt', encoding='utf-8') as f:
+            f.write(contents)
+        with atomic_write(meta_file) as tmp:
+            tmp.write_text(json.dumps({
+                'endpoint': endpoint,
+                'parameters': {k: v for k, v in parameters.items()},
+                'status_code': status_code,
+                'url': url,
+                'stored_at': time.time(),
+            }))
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache is under `max_bytes`."""
+        with self._lock:
+            entries = sorted((f.stat().st_mtime, f.stat().st_size, f) for f in self.path.glob('*.json.gz'))
+            total = sum(size for _, size, _ in entries)
+            for _, size, body_file in entries:
+                if total <= self.max_bytes:
+                    break
+                body_file.unlink(missing_ok=True)
+                body_file.with_name(body_file.name.replace('.json.gz', '.meta.json')).unlink(missing_ok=True)
+                total -= size
+
+    def coalesce(self, endpoint, parameters, fetch):
+        """Call `fetch()` once for any number of identical concurrent requests and share the result."""
+        key = self.key(endpoint, parameters)
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+
+        if not owner:
+            logger.debug(f"Waiting on in-flight request to {endpoint}")
+            return future.result()
+
+        try:
+            future.set_result(fetch())
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._inflight[key]
+        return future.result()
+
+
+class _Unsupported(Exception):
+    """A response layout the streaming parser doesn't handle, left to the full decode."""
+
+
+class _JSONStream:
+    """
+    Walks the structure of a JSON document read from a text stream in chunks, decoding each value
+    it's asked for with the json module's C scanner. Only the current chunk is held in memory.
+    """
+    _whitespace = re.compile(r'[ \t\n\r]*')
+    _decoder = json.JSONDecoder()
+
+    def __init__(self, f, chunk_size=1 << 20):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self._bulk_failed = False
+
+    def _more(self):
+        data = '' if self.eof else self.f.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        self._bulk_failed = False
+        return True
+
+    def peek(self):
+        """The next non-whitespace character, without consuming it ('' at the end)."""
+        while True:
+            self.pos = self._whitespace.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._more():
+                return ''
+
+    def take(self, expected):
+        char = self.peek()
+        if char not in expected:
+            raise _Unsupported(f"expected one of {expected!r}, found {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._more():
+                    continue
+                raise
+            # A value running up to the end of the chunk (a number, say) may carry on in the next one
+            if end == len(self.buf) and self._more():
+                continue
+            self.pos = end
+            return value
+
+    def rows(self):
+        """
+        Decode as many complete array items as the chunk holds in one call, by closing the text up to
+        the last "]," in a list. If that cut isn't between items the text won't parse (it would leave a
+        string or array open), and single items are decoded until the next chunk arrives.
+        """
+        cut = self.buf.rfind('],', self.pos) + 1
+        if cut > self.pos and not self._bulk_failed:
+            try:
+                rows = json.loads('[' + self.buf[self.pos:cut] + ']')
+                self.pos = cut
+                return rows
+            except json.JSONDecodeError:
+                self._bulk_failed = True
+        return [self.value()]
+
+    def keys(self):
+        """Each key of an object; the caller consumes the value before asking for the next key."""
+        self.take('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.take(':')
+            yield key
+            if self.take(',}') == '}':
+                return
+
+    def items(self):
+        """Each item of an array; the caller consumes the item before asking for the next."""
+        self.take('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield
+            if self.take(',]') == ']':
+                return
+
+
+class _Column:
+    """
+    One resultSet column, packed a chunk of rows at a time into int64/float64 arrays, or object
+    arrays in which repeated labels share one string, instead of a Python object per value.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.strings = {}
+        # Per float chunk: which values were None and which were ints, to rebuild them if the column ends up as objects
+        self.restore = {}
+
+    def pack(self, values):
+        kinds = set(map(type, values))
+        if kinds <= {int}:
+            try:
+                self.chunks.append(np.array(values, dtype=np.int64))
+                return
+            except OverflowError:
+                pass
+        elif kinds <= {int, float, type(None)} and kinds != {type(None)}:
+            self.restore[len(self.chunks)] = (
+                np.array([v is None for v in values]) if type(None) in kinds else None,
+                np.array([type(v) is int for v in values]) if int in kinds else None,
+            )
+            self.chunks.append(np.array([np.nan if v is None else v for v in values], dtype=np.float64))
+            return
+        if kinds <= {str, type(None)}:
+            # Repeated labels share one string object across the whole column
+            codes, uniques = pd.factorize(np.array(values, dtype=object))
+            labels = np.array([self.strings.setdefault(u, u) for u in uniques] + [None], dtype=object)
+            self.chunks.append(labels[codes])
+        else:
+            chunk = np.empty(len(values), dtype=object)
+            chunk[:] = values
+            self.chunks.append(chunk)
+
+    def _objects(self, i):
+        # A chunk's original values, as an object array
+        chunk = self.chunks[i]
+        if i not in self.restore:
+            return chunk.astype(object)
+        missing, ints = self.restore[i]
+        values = chunk.astype(object)
+        if ints is not None:
+            values[ints] = chunk[ints].astype(np.int64).astype(object)
+        if missing is not None:
+            values[missing] = None
+        return values
+
+    def values(self):
+        """The whole column, typed the way a DataFrame built from the rows would infer it."""
+        numeric = [c.dtype != object for c in self.chunks]
+        if all(numeric):
+            return np.concatenate(self.chunks)
+        blank = [n or all(v is None for v in c) for c, n in zip(self.chunks, numeric)]
+        if all(blank) and any(numeric):
+            # Ints with missing values become floats
+            return np.concatenate([c if n else np.full(len(c), np.nan) for c, n in zip(self.chunks, numeric)]).astype(np.float64)
+        # Anything else goes back as a list, leaving pandas to infer strings, bools or objects
+        return np.concatenate([self._objects(i) for i in range(len(self.chunks))]).tolist()
+
+
+def _read_rows(stream, chunk_rows):
+    # Decode rows a buffer at a time where possible and pack every `chunk_rows` of them into the column buffers
+    columns, chunk, count = None, [], 0
+    stream.take('[')
+    while stream.peek() not in (']', ''):
+        chunk.extend(stream.rows())
+        if stream.take(',]') == ']':
+            stream.pos -= 1
+        if len(chunk) >= chunk_rows:
+            columns = _pack_rows(chunk, columns)
+            count += len(chunk)
+            chunk = []
+    stream.take(']')
+    if chunk:
+        columns = _pack_rows(chunk, columns)
+        count += len(chunk)
+    return columns or [], count
+
+
+def _pack_rows(rows, columns):
+    width = len(rows[0]) if columns is None else len(columns)
+    if set(map(type, rows)) != {list} or set(map(len, rows)) != {width}:
+        raise _Unsupported("ragged rows")
+    columns = columns or [_Column() for _ in range(width)]
+    for column, values in zip(columns, zip(*rows)):
+        column.pack(values)
+    return columns
+
+
+def parse_result_sets(f, chunk_rows=4096):
+    """
+    Parse the resultSets (or resultSet) of a stats.nba.com response from a text stream, in the
+    {name: {'headers': [...], 'data': ...}} shape of NBAStatsResponse.get_data_sets. Rows are decoded
+    one at a time and packed into per-column arrays, so 'data' is a dict of columns ([] if there are no rows).
+    Decoded rows are lists the garbage collector tracks; packing them `chunk_rows` at a time frees them
+    before many survive into the older generations, which is where collections get expensive.
+    """
+    stream = _JSONStream(f)
+    data_sets = {}
+
+    def result_set():
+        name, headers, columns, rows = None, [], [], 0
+        for key in stream.keys():
+            if key == 'rowSet':
+                columns, rows = _read_rows(stream, chunk_rows)
+            elif key == 'name':
+                name = stream.value()
+            elif key == 'headers':
+                headers = stream.value()
+            else:
+                stream.value()
+        if name is None:
+            return
+        if rows and (len(columns) != len(headers) or not all(isinstance(h, str) for h in headers) or len(set(headers)) != len(headers)):
+            raise _Unsupported(f"headers of {name} don't map to columns")
+        data = {h: c.values() for h, c in zip(headers, columns)} if rows else []
+        data_sets[name] = {'headers': headers, 'data': data}
+
+    for key in stream.keys():
+        if key in ('resultSets', 'resultSet') and stream.peek() == '[':
+            for _ in stream.items():
+                result_set()
+        elif key in ('resultSets', 'resultSet') and stream.peek() == '{':
+            result_set()
+        else:
+            stream.value()
+    return data_sets
+
+
+class StreamingNBAStatsResponse(NBAStatsResponse):
+    """
+    A response whose body stays in its gzip file in the response cache. get_data_sets parses the
+    file a chunk at a time straight into column arrays; the body is only read into one string if
+    something asks for the raw response or dict.
+    """
+
+    def __init__(self, response=None, status_code=None, url=None, body_file=None):
+        super().__init__(response, status_code, url)
+        self._body_file = body_file
+
+    def get_response(self):
+        if self._response is None:
+            with gzip.open(self._body_file, 'rt', encoding='utf-8') as f:
+                self._response = f.read()
+        return self._response
+
+    def get_dict(self):
+        # NBAResponse decodes self._response directly, which is None until the body has been read;
+        # get_json, valid_json, get_normalized_dict and the full decode fallback all come through here
+        return json.loads(self.get_response())
+
+    @timed('parse_response')
+    def get_data_sets(self, endpoint=None):
+        if endpoint is None and self._response is None:
+            try:
+                with gzip.open(self._body_file, 'rt', encoding='utf-8') as f:
+                    return parse_result_sets(f)
+            except _Unsupported as e:
+                logger.debug(f"Falling back to a full decode: {e}")
+            except json.JSONDecodeError:
+                # Don't replay a bad body from the cache
+                self._body_file.unlink(missing_ok=True)
+                raise
+        return super().get_data_sets(endpoint)
+
+
+# Called after every request as hook(endpoint, parameters, seconds, size, status, cached, error, wait),
+# e.g. utils.Profile.RunProfile.request. Cache hits report no size, having read nothing yet, and
+# `wait` is the time the request spent queued on the rate limit before going out.
+request_hooks = []
+
+
+def _body_bytes(text):
+    # Size of the body as sent, UTF-8 encoded. stats.nba.com bodies are almost always ASCII, where
+    # that's just the length, so they aren't copied to count them
+    return len(text) if text.isascii() else len(text.encode('utf-8'))
+
+
+def _report(*record):
+    for hook in request_hooks:
+        hook(*record)
+
+
+class LoggedNBAStatsHTTP(NBAStatsHTTP):
+    # A utils.FetchScheduler.TokenBucket shared by every request that goes out to the network, retries
+    # included, so the rate limit holds however many requests a task makes; None for no limit
+    bucket = None
+
+    def send_api_request(self, endpoint, parameters, referer=None, proxy=None, headers=None, timeout=(20,120), raise_exception_on_error=False):
+        queued = time.perf_counter()
+        if self.bucket is not None:
+            self.bucket.acquire()
+        logger.debug(f"Starting API request to {endpoint}")
+        start = time.perf_counter()
+        try:
+            response = super().send_api_request(endpoint, parameters, referer, proxy, headers, timeout, raise_exception_on_error)
+            logger.debug("Request completed successfully")
+            logger.debug("Starting to process response")
+            _report(endpoint, parameters, time.perf_counter() - start, _body_bytes(response.get_response()), response._status_code, False, None, start - queued)
+            return response
+        except Exception as e:
+            logger.error(f"Request failed with error: {str(e)}")
+            logger.error(f"Error type: {type(e)}")
+            _report(endpoint, parameters, time.perf_counter() - start, None, None, False, e, start - queued)
+            raise
+
+
+class CachedNBAStatsHTTP(LoggedNBAStatsHTTP):
+    # Endpoints create a fresh HTTP object per request, so configuration lives on the class
+    cache = ResponseCache()
+    offline = False
+
+    def send_api_request(self, endpoint, parameters, referer=None, proxy=None, headers=None, timeout=(20,120), raise_exception_on_error=False):
+        start = time.perf_counter()
+        cached = self.cache.lookup(endpoint, parameters, ignore_ttl=self.offline)
+        if cached is not None:
+            logger.debug(f"Serving {endpoint} from cache")
+            _report(endpoint, parameters, time.perf_counter() - start, None, cached[1], True, None, 0.0)
+            return self._cached_response(*cached)
+        if self.offline:
+            raise OfflineCacheMiss(f"No cached response for {endpoint} {parameters}")
+
+        def fetch():
+            response = super(CachedNBAStatsHTTP, self).send_api_request(endpoint, parameters, referer, proxy, headers, timeout, raise_exception_on_error)
+            # Only keep good responses, errors should be retried next time. Decoding the whole body just to
+            # check it would cost as much memory as parsing it, so catch error pages by their shape instead.
+            contents = response.get_response()
+            if response._status_code == 200 and contents.lstrip()[:1] == '{' and contents.rstrip()[-1:] == '}':
+                self.cache.put(endpoint, parameters, contents, response._status_code, response.get_url())
+                # Hand back the cached copy, so the body text is freed before it's parsed
+                cached = self.cache.lookup(endpoint, parameters, ignore_ttl=True)
+                if cached is not None:
+                    return self._cached_response(*cached)
+            return response
+
+        return self.cache.coalesce(endpoint, parameters, fetch)
+
+    @staticmethod
+    def _cached_response(body_file, status_code, url):
+        return StreamingNBAStatsResponse(status_code=status_code, url=url, body_file=body_file)
+
+
+def install(http_class=CachedNBAStatsHTTP, offline=False, cache=None, bucket=None):
+    """
+    Route every nba_api stats endpoint through `http_class`. Endpoints bind NBAStatsHTTP at
+    import time, so ones already imported are patched, and ones imported later pick it up from
+    nba_api's http module. `bucket` rate-limits requests that miss the cache.
+    """
+    if cache is not None:
+        http_class.cache = cache
+    if bucket is not None:
+        http_class.bucket = bucket
+    http_class.offline = offline
+    http_module.NBAStatsHTTP = http_class
+    for name, module in list(sys.modules.items()):
+        if name.startswith('nba_api.stats.endpoints.') and hasattr(module, 'NBAStatsHTTP'):
+            module.NBAStatsHTTP = http_class